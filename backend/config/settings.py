@@ -89,6 +89,37 @@ MEDIA_ROOT = BASE_DIR / 'media'
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+# Cache Configuration
+# Local memory is per process; use a shared backend (Redis, Memcached) when
+# running several workers so that cache invalidation reaches all of them.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'realestate',
+    }
+}
+REALESTATE_CACHE_ALIAS = 'default'
+REALESTATE_COUNT_CACHE_TIMEOUT = 300  # seconds
+# Invalidation counters expire after this long (None: never), which bounds how
+# long a per-process cache can miss image changes made by other processes
+REALESTATE_GENERATION_TIMEOUT = 300  # seconds
+# Public list/detail responses; set the alias to use a separate cache and the
+# timeout to 0 to disable. Writes invalidate immediately, the timeout only
+# bounds how stale view counts in cached lists can get.
+REALESTATE_RESPONSE_CACHE_ALIAS = None
+REALESTATE_RESPONSE_CACHE_TIMEOUT = 60  # seconds
+# Serialize the public property list from values() rows instead of model
+# instances (same output, see FastPropertyListSerializer)
+REALESTATE_FAST_LIST_SERIALIZER = True
+# Property view counts are buffered per process and written in batches after
+# this many seconds or pending views (0 seconds writes every view at once)
+REALESTATE_VIEW_COUNT_FLUSH_INTERVAL = 10  # seconds
+REALESTATE_VIEW_COUNT_FLUSH_SIZE = 500
+# Uploaded images get resized WebP/JPEG variants rendered in the background,
+# by this many worker processes per web process (0 renders in a thread)
+REALESTATE_IMAGE_VARIANTS = True
+REALESTATE_IMAGE_WORKERS = 2
+
 # CORS Configuration
 CORS_ALLOWED_ORIGINS = [
     'http://localhost:3000',
@@ -117,6 +148,17 @@ REST_FRAMEWORK = {
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.AllowAny',
     ],
+    # orjson-backed JSON (same output); falls back to DRF's JSON classes
+    # when orjson is not installed
+    'DEFAULT_RENDERER_CLASSES': [
+        'realestate.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'realestate.parsers.ORJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
     'DEFAULT_PAGINATION_CLASS': 'realestate.pagination.StandardResultsSetPagination',
     'PAGE_SIZE': 12,
     'DEFAULT_THROTTLE_CLASSES': [
@@ -0,0 +1,183 @@
+"""
+Set-based admin actions on many properties at once.
+
+A selection is either a list of ids or a filter over the admin listing
+fields. It is resolved with one query, which also reads the current values
+of the fields the action writes. Only the rows whose values actually change
+are written, with one UPDATE per distinct set of new values (chunked for long
+selections). ``properties_bulk_changed`` then invalidates the caches once for
+the whole batch instead of once per row.
+"""
+
+from dateutil import parser as date_parser
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Property
+from .signals import properties_bulk_changed
+
+
+# Longest list of ids accepted in one request, and most properties a filter
+# may select
+MAX_IDS = 5000
+
+# Ids per UPDATE, to stay below SQLite's limit on query parameters
+UPDATE_CHUNK_SIZE = 500
+
+
+class SelectionError(ValueError):
+    """Raised for selections that cannot be resolved."""
+
+
+def listing_status_values(listing_status):
+    """Values written when a property moves to ``listing_status``."""
+    values = {'listing_status': listing_status}
+    if listing_status == Property.ListingStatus.PUBLISHED:
+        values['scheduled_publish_at'] = None
+    return values
+
+
+def _choice(choices, name):
+    valid = [choice[0] for choice in choices]
+
+    def build(value):
+        value = str(value).upper()
+        if value not in valid:
+            raise SelectionError(f'Invalid {name}. Must be one of: {", ".join(valid)}')
+        return Q(**{name: value})
+    return build
+
+
+def _boolean(value):
+    if isinstance(value, bool):
+        return Q(featured=value)
+    if str(value).lower() in ('true', '1'):
+        return Q(featured=True)
+    if str(value).lower() in ('false', '0'):
+        return Q(featured=False)
+    raise SelectionError('featured must be true or false')
+
+
+def _before(name, field):
+    def build(value):
+        try:
+            moment = date_parser.parse(str(value))
+        except (ValueError, OverflowError):
+            raise SelectionError(f'Invalid date format for {name}')
+        if timezone.is_naive(moment):
+            moment = timezone.make_aware(moment)
+        return Q(**{f'{field}__lt': moment})
+    return build
+
+
+def _search(value):
+    value = str(value).strip()
+    return Q(title__icontains=value) | Q(location_text__icontains=value)
+
+
+# Filter name -> builder of the matching Q object
+FILTERS = {
+    'listing_status': _choice(Property.ListingStatus.choices, 'listing_status'),
+    'status': _choice(Property.Status.choices, 'status'),
+    'featured': _boolean,
+    'search': _search,
+    'created_before': _before('created_before', 'created_at'),
+    'updated_before': _before('updated_before', 'updated_at'),
+}
+
+
+def select(data):
+    """
+    Resolve a request body to ``(queryset, ids)``.
+
+    The body holds either ``ids``, a list of property ids (returned as
+    ``ids`` to report the missing ones), or ``filter``, an object of
+    ``FILTERS`` criteria that must all match (``ids`` is then None).
+    Empty criteria are rejected rather than read as "match everything".
+    """
+    ids, criteria = data.get('ids'), data.get('filter')
+    if (ids is None) == (criteria is None):
+        raise SelectionError('Pass either ids or filter')
+
+    if ids is not None:
+        if not isinstance(ids, list) or not ids:
+            raise SelectionError('ids must be a non-empty list')
+        if len(ids) > MAX_IDS:
+            raise SelectionError(f'At most {MAX_IDS} ids can be changed at once')
+        try:
+            ids = list(dict.fromkeys(int(pk) for pk in ids))
+        except (TypeError, ValueError):
+            raise SelectionError('ids must be integers')
+        return Property.objects.filter(pk__in=ids), ids
+
+    if not isinstance(criteria, dict) or not criteria:
+        raise SelectionError('filter must be an object with at least one criterion')
+    unknown = sorted(set(criteria) - set(FILTERS))
+    if unknown:
+        raise SelectionError(
+            f'Unknown filter: {", ".join(unknown)}. Must be one of: {", ".join(FILTERS)}'
+        )
+    condition = Q()
+    for name, value in criteria.items():
+        if value is None or not str(value).strip():
+            raise SelectionError(f'The {name} filter must not be empty')
+        condition &= FILTERS[name](value)
+    return Property.objects.filter(condition), None
+
+
+def apply(queryset, fields, new_values, ids=None):
+    """
+    Write ``new_values(current)`` to every selected property.
+
+    ``current`` maps ``fields`` to a row's current values, and
+    ``new_values`` returns the values to write. Returns the per-property
+    results (in the order of ``ids`` when given) and the number of rows
+    changed. Raises SelectionError, without writing anything, when the
+    selection holds more than ``MAX_IDS`` properties.
+    """
+    now = timezone.now()
+    results = {}
+    groups = {}
+    with transaction.atomic():
+        rows = list(
+            queryset.select_for_update().order_by('pk').values_list('pk', *fields)[:MAX_IDS + 1]
+        )
+        if len(rows) > MAX_IDS:
+            raise SelectionError(
+                f'The filter matches more than {MAX_IDS} properties; narrow it down'
+            )
+        for pk, *values in rows:
+            current = dict(zip(fields, values))
+            target = new_values(current)
+            changed = any(current[name] != value for name, value in target.items())
+            if changed:
+                groups.setdefault(tuple(sorted(target.items())), []).append(pk)
+            results[pk] = dict(
+                {'id': pk, 'result': 'updated' if changed else 'unchanged'},
+                **{**current, **target}
+            )
+
+        for target, pks in groups.items():
+            for start in range(0, len(pks), UPDATE_CHUNK_SIZE):
+                Property.objects.filter(pk__in=pks[start:start + UPDATE_CHUNK_SIZE]).update(
+                    updated_at=now, **dict(target)
+                )
+
+    changed_pks = [pk for pks in groups.values() for pk in pks]
+    if changed_pks:
+        properties_bulk_changed.send(
+            sender=Property,
+            created=[],
+            updated=changed_pks,
+            fields=list(fields) + ['updated_at']
+        )
+
+    for result in results.values():
+        if 'listing_status' in result:
+            result['listing_status_display'] = Property.ListingStatus(result['listing_status']).label
+    if ids is None:
+        ordered = list(results.values())
+    else:
+        ordered = [results.get(pk, {'id': pk, 'result': 'not_found'}) for pk in ids]
+    return ordered, len(changed_pks)
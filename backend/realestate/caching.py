@@ -0,0 +1,420 @@
+"""
+Caching helpers for the Real Estate API.
+
+Cached values are versioned by per-model generation counters kept in the
+cache backend. Any write to a tracked model bumps its generation, which makes
+every value cached under the previous generation unreachable at once, without
+having to find and delete individual keys. This backs both the cached list
+counts and the cached public property responses.
+
+The backend is the Django cache named by ``REALESTATE_CACHE_ALIAS``: the
+default local-memory cache is per process; point it at a shared backend
+(Redis, Memcached, database) when running several workers. Responses can be
+kept in a separate cache with ``REALESTATE_RESPONSE_CACHE_ALIAS``; the
+generation counters always live in the main one, so it has to be shared
+whenever the response cache is.
+
+A per-process cache never sees the generation bumps of writes made by other
+processes (the ``publish_scheduled`` and ``import_properties`` commands,
+other web workers). Generations therefore expire after
+``REALESTATE_GENERATION_TIMEOUT`` seconds, which bounds how long anything
+keyed on them can lag, and the public property validators and cache keys
+also include ``property_state``, read from the database, so that property
+writes show up on the next request whatever the cache backend.
+"""
+
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import Count, IntegerField, Max, Min, Subquery, Value
+
+from .search_utils import normalize_text
+
+
+KEY_PREFIX = 'realestate'
+
+# Generation bumped when the public map changes: a published property is
+# created or deleted, or its coordinates, price, status or slug change, or it
+# is published or unpublished (see Property.map_changed)
+MAP_GENERATION = 'realestate.map'
+
+
+def get_cache():
+    """Return the cache backend used by the Real Estate API."""
+    return caches[getattr(settings, 'REALESTATE_CACHE_ALIAS', 'default')]
+
+
+def _model_label(model):
+    return model if isinstance(model, str) else model._meta.label_lower
+
+
+def generation_timeout():
+    """Seconds a generation counter is kept; None keeps it until evicted."""
+    return getattr(settings, 'REALESTATE_GENERATION_TIMEOUT', 300)
+
+
+# =============================================================================
+# Generation counters
+# =============================================================================
+
+def _generation_key(model):
+    return f'{KEY_PREFIX}:generation:{_model_label(model)}'
+
+
+def get_generation(model):
+    """Return the current generation for a model."""
+    cache = get_cache()
+    key = _generation_key(model)
+    generation = cache.get(key)
+    if generation is None:
+        # Seed from the clock rather than 1 so that a counter evicted from
+        # the cache never comes back at a value that was already used
+        cache.add(key, int(time.time() * 1000), timeout=generation_timeout())
+        generation = cache.get(key)
+    return generation
+
+
+def bump_generation(model):
+    """Invalidate everything cached under the model's current generation."""
+    cache = get_cache()
+    key = _generation_key(model)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, int(time.time() * 1000), timeout=generation_timeout())
+    cache.set(_modified_key(model), time.time(), timeout=generation_timeout())
+
+
+def bump_generations(models):
+    """
+    Bump several generations with one read and one write to the cache.
+
+    Unlike ``bump_generation`` this is not an atomic increment: the new
+    value is the later of the old value plus one and the clock in
+    milliseconds, so that two concurrent bumps of the same counter still
+    move it past every value already handed out.
+    """
+    models = list(models)
+    if not models:
+        return
+    cache = get_cache()
+    keys = [_generation_key(model) for model in models]
+    current = cache.get_many(keys)
+    now = time.time()
+    clock = int(now * 1000)
+    values = {key: max(current.get(key, 0) + 1, clock) for key in keys}
+    values.update({_modified_key(model): now for model in models})
+    cache.set_many(values, timeout=generation_timeout())
+
+
+def _modified_key(model):
+    return f'{KEY_PREFIX}:modified:{_model_label(model)}'
+
+
+def get_last_modified(model):
+    """
+    Return the time (epoch seconds) of the model's last generation bump.
+
+    When it is not known (never bumped, or evicted), the current time is
+    recorded and returned, so that it can only err towards "modified".
+    """
+    cache = get_cache()
+    key = _modified_key(model)
+    modified = cache.get(key)
+    if modified is None:
+        cache.add(key, time.time(), timeout=generation_timeout())
+        modified = cache.get(key)
+    return modified
+
+
+# =============================================================================
+# Database state
+# =============================================================================
+
+def property_state():
+    """
+    ``(row count, latest updated_at)`` of the Property table.
+
+    Every property write sets ``updated_at`` (``save()``, the bulk actions,
+    the importer and the scheduler alike) and deletes change the count, so
+    this changes with any write, from any process.
+    """
+    from .models import Property
+
+    # The latest row from the prop_updated_idx index, with the count as a
+    # scalar subquery: as one aggregate, COUNT and MAX would scan the index
+    count = Property.objects.order_by().annotate(one=Value(1)).values('one').annotate(
+        count=Count('*')
+    ).values('count')
+    state = Property.objects.order_by('-updated_at').annotate(
+        count=Subquery(count, output_field=IntegerField())
+    ).values_list('count', 'updated_at').first()
+    return state or (0, None)
+
+
+def request_property_state(request):
+    """``property_state``, read at most once per request."""
+    state = getattr(request, '_realestate_property_state', None)
+    if state is None:
+        state = property_state()
+        request._realestate_property_state = state
+    return state
+
+
+# =============================================================================
+# Cache keys
+# =============================================================================
+
+def canonical_query_params(params, exclude=(), normalize=()):
+    """
+    Return a canonical, hashable form of a request's query parameters.
+
+    Parameters are sorted by name and value. Parameters listed in
+    ``normalize`` are run through ``normalize_text``; only list filters that
+    the views themselves match accent- and case-insensitively, so that two
+    requests share a key only if they return the same rows.
+    """
+    items = []
+    for name in sorted(params.keys()):
+        if name in exclude:
+            continue
+        for value in sorted(params.getlist(name)):
+            if name in normalize:
+                value = normalize_text(value)
+            items.append((name, value))
+    return tuple(items)
+
+
+def make_key(kind, *parts):
+    """Build a cache key; ``parts`` are hashed to keep keys short and safe."""
+    digest = hashlib.sha1(repr(parts).encode('utf-8')).hexdigest()
+    return f'{KEY_PREFIX}:{kind}:{digest}'
+
+
+# =============================================================================
+# Count cache
+# =============================================================================
+
+# Models whose list counts may be cached (their writes bump the generation)
+COUNT_CACHE_MODELS = {'realestate.property', 'realestate.message', 'realestate.notification'}
+
+# Query parameters that do not affect which rows are counted
+NON_FILTER_PARAMS = {'page', 'page_size', 'cursor', 'ordering', 'count', 'fields', 'exclude'}
+
+# Query parameters selecting the fields of a response
+SPARSE_FIELDS_PARAMS = ('fields', 'exclude')
+
+# Filters matched accent- and case-insensitively by the views
+NORMALIZED_FILTER_PARAMS = {'q', 'location'}
+
+
+def count_cache_key(request, model):
+    """Cache key for the row count of a filtered list request."""
+    filters = canonical_query_params(
+        request.query_params,
+        exclude=NON_FILTER_PARAMS,
+        normalize=NORMALIZED_FILTER_PARAMS
+    )
+    label = _model_label(model)
+    # Property counts also follow writes made by other processes
+    state = request_property_state(request) if label == 'realestate.property' else None
+    return make_key('count', label, get_generation(model), state, request.path, filters)
+
+
+def cached_count(request, queryset):
+    """
+    Count a filtered list, reusing a cached value for the same filter set.
+
+    Falls back to a plain COUNT for models whose writes are not tracked.
+    """
+    model = queryset.model
+    if _model_label(model) not in COUNT_CACHE_MODELS:
+        return queryset.count()
+
+    cache = get_cache()
+    key = count_cache_key(request, model)
+    count = cache.get(key)
+    if count is None:
+        count = queryset.count()
+        cache.set(key, count, getattr(settings, 'REALESTATE_COUNT_CACHE_TIMEOUT', 300))
+    return count
+
+
+def estimated_count(request, queryset):
+    """
+    Cheap upper bound for the row count of a filtered list.
+
+    Uses the exact cached count when there is one; otherwise the span of
+    primary keys in the whole table, which is answered from the primary key
+    index without touching the filtered rows.
+    """
+    model = queryset.model
+    if _model_label(model) in COUNT_CACHE_MODELS:
+        count = get_cache().get(count_cache_key(request, model))
+        if count is not None:
+            return count
+
+    bounds = model._default_manager.aggregate(low=Min('pk'), high=Max('pk'))
+    if bounds['high'] is None:
+        return 0
+    return bounds['high'] - bounds['low'] + 1
+
+
+# =============================================================================
+# Response cache
+# =============================================================================
+
+# Public endpoints whose responses are cached
+RESPONSE_CACHE_KINDS = ('property-list', 'property-facets', 'property-detail', 'property-clusters')
+
+
+def get_response_cache():
+    """Return the cache backend used for public API responses."""
+    alias = getattr(settings, 'REALESTATE_RESPONSE_CACHE_ALIAS', None)
+    if alias is None:
+        return get_cache()
+    return caches[alias]
+
+
+def response_cache_timeout():
+    """Seconds a response stays cached; 0 disables the response cache."""
+    return getattr(settings, 'REALESTATE_RESPONSE_CACHE_TIMEOUT', 60)
+
+
+def property_generation_key(pk):
+    """Generation counter for a single property and its images."""
+    return f'realestate.property:{pk}'
+
+
+def list_response_key(request, kind='property-list'):
+    """Cache key for a public property list (or facets) response."""
+    from .models import Property, PropertyImage
+
+    params = canonical_query_params(request.query_params, normalize=NORMALIZED_FILTER_PARAMS)
+    return make_key(
+        'response',
+        kind,
+        get_generation(Property),
+        get_generation(PropertyImage),
+        request_property_state(request),
+        # Pagination and image links are absolute
+        request.build_absolute_uri(request.path),
+        params
+    )
+
+
+def detail_response_key(request, slug, updated_at):
+    """Cache key for a public property detail response."""
+    fields = [(name, request.query_params.get(name)) for name in SPARSE_FIELDS_PARAMS]
+    return make_key(
+        'response', 'property-detail', request.build_absolute_uri(request.path), slug, updated_at, fields
+    )
+
+
+def make_etag(request, key, weak=False):
+    """ETag for the representation of a response cached under ``key``."""
+    # The body also depends on the negotiated renderer (JSON, browsable API)
+    digest = hashlib.sha1(f'{key}:{request.accepted_media_type}'.encode('utf-8')).hexdigest()
+    return f'W/"{digest}"' if weak else f'"{digest}"'
+
+
+def list_validators(request, kind='property-list'):
+    """
+    ``(etag, last_modified)`` of a public property list response.
+
+    The ETag is weak, like the detail one: the body's ``views_count`` values
+    change as view counts are flushed, which neither bumps a generation nor
+    touches ``updated_at``.
+    """
+    from .models import Property, PropertyImage
+
+    latest = request_property_state(request)[1]
+    last_modified = max(
+        get_last_modified(Property),
+        get_last_modified(PropertyImage),
+        latest.timestamp() if latest else 0
+    )
+    return make_etag(request, list_response_key(request, kind), weak=True), int(last_modified)
+
+
+def detail_validators(request, slug, pk, updated_at):
+    """
+    ``(etag, last_modified)`` of a public property detail response.
+
+    The ETag is weak: the body's ``views_count`` changes with every request,
+    while the representation it validates stays the same.
+    """
+    generation_key = property_generation_key(pk)
+    key = make_key(
+        'validators', detail_response_key(request, slug, updated_at), pk, get_generation(generation_key)
+    )
+    # Image changes do not touch updated_at, but bump the property's generation
+    last_modified = max(updated_at.timestamp(), get_last_modified(generation_key))
+    return make_etag(request, key, weak=True), int(last_modified)
+
+
+def get_cached_response(kind, key):
+    """
+    Return cached response data, or None on a miss.
+
+    Detail entries are stored with the property's own generation and are
+    only returned while it is unchanged, so that a property can be
+    invalidated without knowing which slugs it was cached under.
+    """
+    if not response_cache_timeout():
+        return None
+    entry = get_response_cache().get(key)
+    if entry is not None and kind == 'property-detail':
+        pk, generation, data = entry
+        entry = (pk, data) if get_generation(property_generation_key(pk)) == generation else None
+    record_response_cache_event(kind, 'hits' if entry is not None else 'misses')
+    return entry
+
+
+def set_cached_response(kind, key, data, pk=None):
+    """Cache response data; detail entries need the property's ``pk``."""
+    if not response_cache_timeout():
+        return
+    if kind == 'property-detail':
+        data = (pk, get_generation(property_generation_key(pk)), data)
+    get_response_cache().set(key, data, response_cache_timeout())
+
+
+def _stats_key(kind, event):
+    return f'{KEY_PREFIX}:stats:response:{kind}:{event}'
+
+
+def record_response_cache_event(kind, event):
+    cache = get_response_cache()
+    key = _stats_key(kind, event)
+    try:
+        cache.incr(key)
+    except ValueError:
+        if not cache.add(key, 1, timeout=None):
+            cache.incr(key)
+
+
+def response_cache_stats():
+    """Hit/miss counters per cached endpoint since the last reset."""
+    cache = get_response_cache()
+    keys = [_stats_key(kind, event) for kind in RESPONSE_CACHE_KINDS for event in ('hits', 'misses')]
+    values = cache.get_many(keys)
+    stats = {}
+    for kind in RESPONSE_CACHE_KINDS:
+        hits = values.get(_stats_key(kind, 'hits'), 0)
+        misses = values.get(_stats_key(kind, 'misses'), 0)
+        total = hits + misses
+        stats[kind] = {
+            'hits': hits,
+            'misses': misses,
+            'hit_ratio': round(hits / total, 4) if total else None,
+        }
+    return stats
+
+
+def reset_response_cache_stats():
+    get_response_cache().delete_many(
+        [_stats_key(kind, event) for kind in RESPONSE_CACHE_KINDS for event in ('hits', 'misses')]
+    )
@@ -0,0 +1,268 @@
+"""
+Facet counts for the public property filters.
+
+Facets are "disjunctive": the counts for one facet apply every active filter
+except that facet's own, so they tell how many results each alternative value
+would give.
+
+Counts are computed from an in-memory, columnar snapshot of the published
+listings. Every facet value and every active filter is a bitmap (a Python
+int with one bit per listing), so each count is an AND of a few bitmaps and a
+popcount, whatever the size of the catalogue. The snapshot is rebuilt
+whenever the Property cache generation or ``caching.property_state`` changes;
+the latter catches writes made by other processes (e.g. ``publish_scheduled``)
+when the cache is per process.
+"""
+
+import bisect
+import threading
+from decimal import Decimal
+
+from django.db.models import FloatField
+from django.db.models.functions import Cast
+
+from . import caching
+from .models import Property
+
+
+# (min, max) bounds; min is inclusive, max exclusive, None is unbounded
+PRICE_BUCKETS = [
+    (None, 1000),
+    (1000, 50000),
+    (50000, 100000),
+    (100000, 200000),
+    (200000, 500000),
+    (500000, None),
+]
+
+SIZE_BUCKETS = [
+    (None, 50),
+    (50, 100),
+    (100, 150),
+    (150, 250),
+    (250, None),
+]
+
+# Bedroom counts from this value up are grouped into one "N+" facet value,
+# which the ``min_bedrooms`` filter selects
+MAX_BEDROOMS_FACET = 5
+
+
+def parse_number(value):
+    """
+    Parse a numeric filter value as a float.
+
+    Prices and sizes have two decimal places and at most twelve digits, which
+    floats represent without two different values colliding, so comparing
+    floats gives the same result as comparing the decimals.
+    """
+    number = Decimal(value)
+    if not number.is_finite():
+        raise ValueError(f'Not a finite number: {value}')
+    return float(number)
+
+
+def bitmap(positions, size):
+    """Bitmap (int) with the bits at ``positions`` set."""
+    bits = bytearray((size + 7) // 8)
+    for position in positions:
+        bits[position >> 3] |= 1 << (position & 7)
+    return int.from_bytes(bits, 'little')
+
+
+class SortedColumn:
+    """A numeric column, sorted, for range lookups."""
+
+    def __init__(self, values):
+        self.order = sorted(range(len(values)), key=values.__getitem__)
+        self.values = [values[position] for position in self.order]
+        self.size = len(values)
+
+    def range_mask(self, low=None, high=None, high_inclusive=False):
+        """Bitmap of rows with ``low <= value < high`` (or ``<= high``)."""
+        start = 0 if low is None else bisect.bisect_left(self.values, low)
+        if high is None:
+            end = self.size
+        elif high_inclusive:
+            end = bisect.bisect_right(self.values, high)
+        else:
+            end = bisect.bisect_left(self.values, high)
+        return bitmap(self.order[start:end], self.size)
+
+
+class FacetSnapshot:
+    """Bitmaps over the published listings for the facet columns."""
+
+    def __init__(self, rows):
+        # rows: (pk, status, bedrooms, price, size_sqm, featured)
+        self.size = len(rows)
+        self.all = (1 << self.size) - 1
+        self.positions = {row[0]: position for position, row in enumerate(rows)}
+
+        statuses = {}
+        bedrooms = {}
+        featured = []
+        for position, (_, status, bedroom_count, _, _, is_featured) in enumerate(rows):
+            statuses.setdefault(status, []).append(position)
+            bedrooms.setdefault(bedroom_count, []).append(position)
+            if is_featured:
+                featured.append(position)
+
+        self.status_masks = {value: bitmap(positions, self.size) for value, positions in statuses.items()}
+        self.bedroom_masks = {value: bitmap(positions, self.size) for value, positions in bedrooms.items()}
+        self.featured_mask = bitmap(featured, self.size)
+        self.prices = SortedColumn([row[3] for row in rows])
+        self.sizes = SortedColumn([row[4] for row in rows])
+
+        more_bedrooms = self.min_bedrooms_mask(MAX_BEDROOMS_FACET)
+
+        # Facet name -> list of (value description, bitmap)
+        self.facets = {
+            'status': [
+                ({'value': value, 'label': label}, self.status_masks.get(value, 0))
+                for value, label in Property.Status.choices
+            ],
+            'bedrooms': [
+                ({'value': count}, self.bedroom_masks.get(count, 0))
+                for count in range(MAX_BEDROOMS_FACET)
+            ] + [({'value': MAX_BEDROOMS_FACET, 'or_more': True}, more_bedrooms)],
+            'price': [
+                ({'min': low or 0, 'max': high}, self.prices.range_mask(low, high))
+                for low, high in PRICE_BUCKETS
+            ],
+            'size': [
+                ({'min': low or 0, 'max': high}, self.sizes.range_mask(low, high))
+                for low, high in SIZE_BUCKETS
+            ],
+        }
+
+    def min_bedrooms_mask(self, minimum):
+        """Bitmap of rows with at least ``minimum`` bedrooms."""
+        mask = 0
+        for value, value_mask in self.bedroom_masks.items():
+            if value >= minimum:
+                mask |= value_mask
+        return mask
+
+    def ids_mask(self, ids):
+        """Bitmap of the given property ids (ids not in the snapshot are ignored)."""
+        positions = self.positions
+        return bitmap((positions[pk] for pk in ids if pk in positions), self.size)
+
+    def filter_masks(self, params):
+        """
+        Bitmaps of the active facet filters in ``params``, as ``{facet: mask}``.
+
+        Mirrors the filters of ``PublicPropertyListView``. Raises ValueError
+        or ArithmeticError for values that are not numbers.
+        """
+        masks = {}
+
+        status = params.get('status')
+        if status:
+            masks['status'] = self.status_masks.get(status.upper(), 0)
+
+        min_price, max_price = params.get('min_price'), params.get('max_price')
+        if min_price or max_price:
+            masks['price'] = self.prices.range_mask(
+                parse_number(min_price) if min_price else None,
+                parse_number(max_price) if max_price else None,
+                high_inclusive=True
+            )
+
+        bedrooms, min_bedrooms = params.get('bedrooms'), params.get('min_bedrooms')
+        if bedrooms or min_bedrooms:
+            mask = self.all
+            if bedrooms:
+                mask &= self.bedroom_masks.get(int(bedrooms), 0)
+            if min_bedrooms:
+                mask &= self.min_bedrooms_mask(int(min_bedrooms))
+            masks['bedrooms'] = mask
+
+        min_size, max_size = params.get('min_size'), params.get('max_size')
+        if min_size or max_size:
+            masks['size'] = self.sizes.range_mask(
+                parse_number(min_size) if min_size else None,
+                parse_number(max_size) if max_size else None,
+                high_inclusive=True
+            )
+
+        return masks
+
+    def counts(self, base, active):
+        """
+        Facet counts for the rows in ``base`` given the ``active`` filter masks.
+
+        Returns ``{'total': n, <facet>: [{..., 'count': n}]}``.
+        """
+        total = base
+        for mask in active.values():
+            total &= mask
+        result = {'total': total.bit_count()}
+
+        for name, values in self.facets.items():
+            # Every other facet's filter applies, this facet's own does not
+            others = base
+            for facet, mask in active.items():
+                if facet != name:
+                    others &= mask
+            result[name] = [
+                {**description, 'count': (others & mask).bit_count()}
+                for description, mask in values
+            ]
+        return result
+
+
+def build_snapshot():
+    """Load the facet columns of all published listings."""
+    rows = Property.objects.filter(
+        listing_status=Property.ListingStatus.PUBLISHED
+    ).order_by().values_list(
+        'pk', 'status', 'bedrooms',
+        # Floats skip the per-row Decimal conversion (see parse_number)
+        Cast('price', FloatField()), Cast('size_sqm', FloatField()),
+        'featured'
+    )
+    return FacetSnapshot(list(rows))
+
+
+_snapshot = None
+_snapshot_version = None
+_lock = threading.Lock()
+
+
+def get_snapshot(state=None):
+    """
+    Return the process-wide snapshot, rebuilding it after property writes.
+
+    ``state`` is the current ``caching.property_state``, when already read.
+    """
+    global _snapshot, _snapshot_version
+    version = (caching.get_generation(Property), state or caching.property_state())
+    if _snapshot is not None and _snapshot_version == version:
+        return _snapshot
+    with _lock:
+        if _snapshot is None or _snapshot_version != version:
+            _snapshot = build_snapshot()
+            _snapshot_version = version
+        return _snapshot
+
+
+def facet_counts(params, matching_ids=None, state=None):
+    """
+    Facet counts for the public filters in ``params``.
+
+    ``matching_ids`` restricts the counts to the listings matched by the
+    text filters (``q``, ``location``), when there are any.
+    """
+    snapshot = get_snapshot(state)
+    base = snapshot.all if matching_ids is None else snapshot.ids_mask(matching_ids)
+
+    featured = params.get('featured')
+    if featured is not None:
+        if featured.lower() in ('true', '1', 'yes'):
+            base &= snapshot.featured_mask
+        else:
+            base &= ~snapshot.featured_mask
+
+    return snapshot.counts(base, snapshot.filter_masks(params))
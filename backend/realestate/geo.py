@@ -0,0 +1,272 @@
+"""
+Geospatial helpers for property search.
+
+Coordinates are indexed through a geohash column (``Property.geohash``): a
+base32 string in which every extra character narrows the cell, so all points
+inside a cell share its geohash as a prefix. An area query is turned into the
+small set of cells covering it, each cell into a prefix range on the indexed
+column, and the exact bounds (and, for a radius, the haversine distance) are
+checked only on the rows those ranges return. No GIS extension is needed.
+"""
+
+import math
+
+from django.db.models import F, FloatField, Q
+from django.db.models.functions import ASin, Cos, Power, Radians, Sin, Sqrt
+
+
+GEOHASH_ALPHABET = '0123456789bcdefghjkmnpqrstuvwxyz'
+GEOHASH_PRECISION = 12
+
+EARTH_RADIUS_KM = 6371.0088
+
+# Upper bound on the number of geohash cells used to cover a query area
+MAX_COVERING_CELLS = 32
+
+
+class GeoError(ValueError):
+    """Raised for malformed coordinates, boxes or radii."""
+
+
+def encode_geohash(latitude, longitude, precision=GEOHASH_PRECISION):
+    """Geohash of a point, ``precision`` characters long."""
+    latitude, longitude = float(latitude), float(longitude)
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    chars = []
+    bits = 0
+    bit_count = 0
+    even = True
+    while len(chars) < precision:
+        # Bits alternate between longitude (even) and latitude (odd)
+        value, bounds = (longitude, lon_range) if even else (latitude, lat_range)
+        middle = (bounds[0] + bounds[1]) / 2
+        if value >= middle:
+            bits = (bits << 1) | 1
+            bounds[0] = middle
+        else:
+            bits <<= 1
+            bounds[1] = middle
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(GEOHASH_ALPHABET[bits])
+            bits = 0
+            bit_count = 0
+    return ''.join(chars)
+
+
+def cell_size(precision):
+    """``(height, width)`` in degrees of a geohash cell."""
+    lon_bits = (5 * precision + 1) // 2
+    lat_bits = (5 * precision) // 2
+    return 180.0 / (1 << lat_bits), 360.0 / (1 << lon_bits)
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """Great-circle distance between two points in kilometres."""
+    lat1, lon1, lat2, lon2 = map(math.radians, (float(lat1), float(lon1), float(lat2), float(lon2)))
+    a = (
+        math.sin((lat2 - lat1) / 2) ** 2 +
+        math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    )
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+# =============================================================================
+# Query parameters
+# =============================================================================
+
+def _floats(value, count, name):
+    try:
+        numbers = [float(part) for part in value.split(',')]
+    except (AttributeError, ValueError):
+        raise GeoError(f'{name} must be {count} comma-separated numbers')
+    if len(numbers) != count or not all(math.isfinite(number) for number in numbers):
+        raise GeoError(f'{name} must be {count} comma-separated numbers')
+    return numbers
+
+
+def parse_bbox(value):
+    """
+    Parse ``west,south,east,north`` (degrees).
+
+    ``west`` may be greater than ``east`` for boxes crossing the antimeridian.
+    """
+    west, south, east, north = _floats(value, 4, 'bbox')
+    if not (-90 <= south <= north <= 90 and -180 <= west <= 180 and -180 <= east <= 180):
+        raise GeoError('bbox must be west,south,east,north within valid coordinates')
+    return west, south, east, north
+
+
+def parse_point(value):
+    """Parse ``lat,lon`` (degrees)."""
+    latitude, longitude = _floats(value, 2, 'near')
+    if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+        raise GeoError('near must be lat,lon within valid coordinates')
+    return latitude, longitude
+
+
+def parse_radius(value, default):
+    if value in (None, ''):
+        return default
+    try:
+        radius = float(value)
+    except ValueError:
+        raise GeoError('radius_km must be a number')
+    if not (0 < radius <= math.pi * EARTH_RADIUS_KM):
+        raise GeoError('radius_km must be positive')
+    return radius
+
+
+def bbox_around(latitude, longitude, radius_km):
+    """Smallest ``(west, south, east, north)`` box containing the circle."""
+    angular = radius_km / EARTH_RADIUS_KM
+    south = latitude - math.degrees(angular)
+    north = latitude + math.degrees(angular)
+    if south <= -90 or north >= 90:
+        # The circle contains a pole: every longitude is in range
+        return -180.0, max(south, -90.0), 180.0, min(north, 90.0)
+    delta_lon = math.degrees(math.asin(min(1.0, math.sin(angular) / math.cos(math.radians(latitude)))))
+    west = longitude - delta_lon
+    east = longitude + delta_lon
+    if west < -180:
+        west += 360
+    if east > 180:
+        east -= 360
+    if delta_lon >= 180:
+        west, east = -180.0, 180.0
+    return west, south, east, north
+
+
+# =============================================================================
+# Covering cells and filters
+# =============================================================================
+
+def _split_antimeridian(bbox):
+    west, south, east, north = bbox
+    if west <= east:
+        return [bbox]
+    return [(west, south, 180.0, north), (-180.0, south, east, north)]
+
+
+def covering_cells(bbox, max_cells=MAX_COVERING_CELLS):
+    """
+    Geohash cells covering a box, at the finest precision for which at most
+    ``max_cells`` cells are needed.
+    """
+    boxes = _split_antimeridian(bbox)
+    for precision in range(GEOHASH_PRECISION, 0, -1):
+        height, width = cell_size(precision)
+        total = 0
+        for west, south, east, north in boxes:
+            rows = math.floor((north + 90) / height) - math.floor((south + 90) / height) + 1
+            columns = math.floor((east + 180) / width) - math.floor((west + 180) / width) + 1
+            total += rows * columns
+        if total <= max_cells:
+            break
+
+    cells = set()
+    for west, south, east, north in boxes:
+        first_row = math.floor((south + 90) / height)
+        last_row = min(math.floor((north + 90) / height), round(180 / height) - 1)
+        first_column = math.floor((west + 180) / width)
+        last_column = min(math.floor((east + 180) / width), round(360 / width) - 1)
+        for row in range(first_row, last_row + 1):
+            for column in range(first_column, last_column + 1):
+                # Encode the cell centre
+                cells.add(encode_geohash(
+                    (row + 0.5) * height - 90,
+                    (column + 0.5) * width - 180,
+                    precision
+                ))
+    return sorted(cells)
+
+
+def _geohash_value(cell):
+    value = 0
+    for char in cell:
+        value = value * 32 + GEOHASH_ALPHABET.index(char)
+    return value
+
+
+def _geohash_from_value(value, precision):
+    chars = []
+    for _ in range(precision):
+        value, digit = divmod(value, 32)
+        chars.append(GEOHASH_ALPHABET[digit])
+    return ''.join(reversed(chars))
+
+
+def cell_ranges(cells):
+    """
+    Merge sorted cells of one precision into ``(start, end)`` ranges of
+    geohash prefixes; ``end`` is exclusive, or None when unbounded.
+    """
+    ranges = []
+    if not cells:
+        return ranges
+    precision = len(cells[0])
+    limit = 32 ** precision
+    start = previous = _geohash_value(cells[0])
+    for cell in cells[1:]:
+        value = _geohash_value(cell)
+        if value != previous + 1:
+            ranges.append((start, previous + 1))
+            start = value
+        previous = value
+    ranges.append((start, previous + 1))
+    return [
+        (_geohash_from_value(low, precision), _geohash_from_value(high, precision) if high < limit else None)
+        for low, high in ranges
+    ]
+
+
+def geohash_filter(bbox, field='geohash'):
+    """Q object selecting the rows whose geohash falls in a box's cells."""
+    condition = Q()
+    for start, end in cell_ranges(covering_cells(bbox)):
+        # Geohash characters sort in alphabet order, so every geohash in the
+        # cells start..end-1 lies in this string range
+        if end is None:
+            condition |= Q(**{f'{field}__gte': start})
+        else:
+            condition |= Q(**{f'{field}__gte': start, f'{field}__lt': end})
+    return condition
+
+
+def bbox_filter(bbox):
+    """Q object for properties inside a ``(west, south, east, north)`` box."""
+    west, south, east, north = bbox
+    exact = Q(latitude__gte=south, latitude__lte=north)
+    if west <= east:
+        exact &= Q(longitude__gte=west, longitude__lte=east)
+    else:
+        exact &= Q(longitude__gte=west) | Q(longitude__lte=east)
+    # The geohash ranges are answered from the index; the exact bounds are
+    # then only checked on the rows of the covering cells
+    return geohash_filter(bbox) & exact
+
+
+def distance_km(latitude, longitude):
+    """
+    Expression for the haversine distance from a point to each property.
+
+    Built from Django's math functions, which SQLite gets from Django when it
+    lacks them natively.
+    """
+    lat1 = math.radians(latitude)
+    lat2 = Radians(F('latitude'), output_field=FloatField())
+    half_dlat = (lat2 - lat1) / 2
+    half_dlon = (Radians(F('longitude'), output_field=FloatField()) - math.radians(longitude)) / 2
+    a = Power(Sin(half_dlat), 2) + math.cos(lat1) * Cos(lat2) * Power(Sin(half_dlon), 2)
+    return 2 * EARTH_RADIUS_KM * ASin(Sqrt(a))
+
+
+def filter_near(queryset, latitude, longitude, radius_km):
+    """Properties within ``radius_km`` of a point."""
+    return queryset.filter(
+        bbox_filter(bbox_around(latitude, longitude, radius_km))
+    ).alias(
+        distance_km=distance_km(latitude, longitude)
+    ).filter(distance_km__lte=radius_km)
@@ -0,0 +1,158 @@
+"""
+Background generation of responsive image variants.
+
+Uploaded images are stored as-is; once the upload is committed, ``enqueue``
+hands the image to a dispatcher thread, which reads the file from its storage
+and has a process pool render the variants (see ``image_processing``). The
+files are saved next to the originals under ``properties/variants/`` and
+recorded in ``PropertyImage.variants``; ``image_variants_ready`` then
+invalidates the cached responses showing the image.
+
+The pool has ``REALESTATE_IMAGE_WORKERS`` processes (0 renders in the
+dispatcher thread instead) and is per web process. Images whose variants were
+not generated, e.g. because the process stopped first, are picked up by the
+``generate_image_variants`` command.
+"""
+
+import atexit
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import connections
+
+from .image_processing import VARIANT_FORMATS, render_variants
+from .models import PropertyImage
+from .signals import image_variants_ready
+
+
+logger = logging.getLogger(__name__)
+
+VARIANTS_DIR = 'properties/variants'
+
+_pool = None
+_dispatcher = None
+_lock = threading.Lock()
+
+
+def enabled():
+    """Whether uploads get variants generated in the background."""
+    return getattr(settings, 'REALESTATE_IMAGE_VARIANTS', True)
+
+
+def worker_count():
+    """Processes rendering variants; 0 renders in the dispatcher thread."""
+    return getattr(settings, 'REALESTATE_IMAGE_WORKERS', 2)
+
+
+def create_pool(workers):
+    """
+    Process pool for ``render_variants``, or None for 0 workers.
+
+    Workers are spawned rather than forked: a fork of a threaded web
+    process can inherit locks held by other threads.
+    """
+    if workers <= 0:
+        return None
+    return ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+
+
+def get_pool():
+    """The process-wide rendering pool, created on first use."""
+    global _pool
+    with _lock:
+        if _pool is None:
+            _pool = create_pool(worker_count())
+        return _pool
+
+
+def _get_dispatcher():
+    global _dispatcher
+    with _lock:
+        if _dispatcher is None:
+            _dispatcher = ThreadPoolExecutor(
+                max_workers=max(1, worker_count()), thread_name_prefix='image-variants'
+            )
+        return _dispatcher
+
+
+@atexit.register
+def _shutdown():
+    # Queued images are left for generate_image_variants
+    if _dispatcher is not None:
+        _dispatcher.shutdown(wait=False, cancel_futures=True)
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+
+
+def enqueue(image_id):
+    """Generate an image's variants in the background (call after commit)."""
+    if enabled():
+        _get_dispatcher().submit(_process_in_background, image_id)
+
+
+def _process_in_background(image_id):
+    try:
+        process_image(image_id, get_pool())
+    except Exception:
+        logger.exception('Could not generate the variants of image %s', image_id)
+    finally:
+        # Connections are per thread; don't leave this one open
+        connections.close_all()
+
+
+def read_image(image):
+    """The image's file contents, through its storage (local or not)."""
+    with image.image.storage.open(image.image.name, 'rb') as stream:
+        return stream.read()
+
+
+def variant_file_name(image_name, variant, extension):
+    stem = os.path.splitext(os.path.basename(image_name))[0]
+    return f'{VARIANTS_DIR}/{stem}_{variant}.{extension}'
+
+
+def render(data, pool=None):
+    """``render_variants`` in the pool, or in this thread without one."""
+    if pool is None:
+        return render_variants(data)
+    return pool.submit(render_variants, data).result()
+
+
+def store_variants(image, rendered):
+    """
+    Save rendered variants and record them on the image; returns them.
+
+    File names derive from the original's, so re-rendering overwrites the
+    previous files, which copies of the image (sharing its file) also use.
+    """
+    width, height, renderings = rendered
+    storage = image.image.storage
+    variants = {}
+    for names, variant_width, variant_height, encoded in renderings:
+        files = {}
+        for format, data in encoded.items():
+            name = variant_file_name(image.image.name, names[0], VARIANT_FORMATS[format][0])
+            if storage.exists(name):
+                storage.delete(name)
+            files[format] = storage.save(name, ContentFile(data))
+        for name in names:
+            variants[name] = dict(files, width=variant_width, height=variant_height)
+
+    # The rendered size is the displayed one, with the EXIF rotation applied
+    PropertyImage.objects.filter(pk=image.pk).update(variants=variants, width=width, height=height)
+    image_variants_ready.send(sender=PropertyImage, property_id=image.property_id)
+    return variants
+
+
+def process_image(image_id, pool=None):
+    """Render and store one image's variants; returns them (None if the image is gone)."""
+    image = PropertyImage.objects.filter(pk=image_id).first()
+    if image is None or not image.image:
+        return None
+    return store_variants(image, render(read_image(image), pool))
+
@@ -0,0 +1,309 @@
+"""
+Import of property listings from external feeds.
+
+A feed is a CSV file, a JSON array or JSON Lines, with one record per listing.
+Each record carries the listing's id in the feed (``external_id``, or ``id``)
+and any of ``IMPORT_FIELDS``. Listings are matched on ``(source,
+external_id)``; records are hashed, and a record whose hash matches the one
+stored at its last import is skipped without further work, so re-importing
+an unchanged feed only costs one lookup per batch.
+
+Records are streamed (except JSON arrays, which are parsed whole) and written
+in batches with ``bulk_create``/``bulk_update``, one transaction per batch.
+Bulk writes do not send ``post_save``; ``properties_bulk_changed`` keeps the
+search index and the caches in sync instead.
+"""
+
+import codecs
+import csv
+import hashlib
+import json
+import time
+from decimal import Decimal, InvalidOperation
+
+from django.core.exceptions import ValidationError
+from django.db import IntegrityError, models, transaction
+from django.utils import timezone
+
+from .models import Property, SLUG_ATTEMPTS
+from .signals import properties_bulk_changed
+
+
+# Feed fields written to Property
+IMPORT_FIELDS = (
+    'title', 'status', 'listing_status', 'price', 'currency',
+    'location_text', 'address', 'bedrooms', 'bathrooms', 'size_sqm',
+    'description', 'latitude', 'longitude', 'featured',
+    'agent_name', 'agent_phone', 'agent_email',
+)
+
+# Fields a record needs to create a listing
+REQUIRED_FIELDS = ('title', 'price', 'location_text', 'size_sqm')
+
+# Choice fields, matched case-insensitively
+CHOICE_FIELDS = ('status', 'listing_status')
+
+# Spellings of boolean values (case-insensitive); the true ones are those the
+# public filters accept
+TRUE_VALUES = ('true', '1', 'yes')
+FALSE_VALUES = ('false', '0', 'no')
+
+# Decimal fields rounded to their decimal places rather than rejected when a
+# feed is more precise
+ROUNDED_FIELDS = ('latitude', 'longitude')
+
+FORMATS = ('csv', 'json', 'jsonl')
+
+DEFAULT_BATCH_SIZE = 1000
+
+# Invalid records listed in a report (all of them are counted)
+MAX_REPORTED_ERRORS = 100
+
+
+class FeedError(ValueError):
+    """Raised for feeds that cannot be read at all."""
+
+
+def guess_format(filename):
+    """Feed format from a file name's extension, or None."""
+    extension = filename.rsplit('.', 1)[-1].lower() if '.' in filename else ''
+    if extension == 'ndjson':
+        return 'jsonl'
+    return extension if extension in FORMATS else None
+
+
+def read_records(stream, format):
+    """Yield ``(record number, record dict)`` from a binary stream."""
+    if format not in FORMATS:
+        raise FeedError(f'Unknown feed format: {format} (expected one of {", ".join(FORMATS)})')
+    text = codecs.getreader('utf-8-sig')(stream)
+    try:
+        if format == 'csv':
+            # Data starts on line 2, after the header
+            yield from enumerate(csv.DictReader(text), start=2)
+        elif format == 'jsonl':
+            for number, line in enumerate(text, start=1):
+                if line.strip():
+                    yield number, json.loads(line)
+        else:
+            records = json.load(text)
+            if not isinstance(records, list):
+                raise FeedError('A JSON feed must be an array of records')
+            yield from enumerate(records, start=1)
+    except (UnicodeDecodeError, csv.Error, json.JSONDecodeError) as error:
+        raise FeedError(f'Unreadable feed: {error}')
+
+
+def record_values(record):
+    """
+    ``(external_id, values)`` of a feed record.
+
+    ``values`` holds the known fields, as stripped strings.
+    """
+    if not isinstance(record, dict):
+        raise ValidationError('Record is not an object')
+    external_id = str(record.get('external_id') or record.get('id') or '').strip()
+    if not external_id:
+        raise ValidationError('Missing external_id')
+    values = {}
+    for name in IMPORT_FIELDS:
+        if name in record and record[name] is not None:
+            values[name] = str(record[name]).strip()
+    return external_id, values
+
+
+def record_hash(values):
+    return hashlib.sha1(
+        json.dumps(values, sort_keys=True, separators=(',', ':')).encode('utf-8')
+    ).hexdigest()
+
+
+def round_decimal(value, places):
+    """``value`` rounded to ``places`` decimals; left as is if not a number."""
+    try:
+        return str(Decimal(value).quantize(Decimal(1).scaleb(-places)))
+    except InvalidOperation:
+        return value
+
+
+def clean_values(values, creating):
+    """Convert a record's values to Property field values; raises ValidationError."""
+    if creating:
+        missing = [name for name in REQUIRED_FIELDS if not values.get(name)]
+        if missing:
+            raise ValidationError(f'Missing required fields: {", ".join(missing)}')
+
+    cleaned = {}
+    errors = []
+    for name, value in values.items():
+        field = Property._meta.get_field(name)
+        if value == '':
+            if field.null:
+                cleaned[name] = None
+            elif field.has_default():
+                cleaned[name] = field.get_default()
+            elif field.blank:
+                cleaned[name] = ''
+            else:
+                errors.append(f'{name}: this field cannot be blank')
+            continue
+        if name in CHOICE_FIELDS:
+            value = value.upper()
+        elif name in ROUNDED_FIELDS:
+            value = round_decimal(value, field.decimal_places)
+        elif isinstance(field, models.BooleanField):
+            if value.lower() not in TRUE_VALUES + FALSE_VALUES:
+                errors.append(f'{name}: expected one of {", ".join(TRUE_VALUES + FALSE_VALUES)}')
+                continue
+            value = value.lower() in TRUE_VALUES
+        try:
+            cleaned[name] = field.clean(value, None)
+        except ValidationError as error:
+            errors.append(f'{name}: {" ".join(error.messages)}')
+    if errors:
+        raise ValidationError('; '.join(errors))
+    return cleaned
+
+
+class PropertyImporter:
+    """Imports feed records for one source; see ``run``."""
+
+    def __init__(self, source, batch_size=DEFAULT_BATCH_SIZE):
+        if not source:
+            raise FeedError('A feed source name is required')
+        max_length = Property._meta.get_field('external_source').max_length
+        if len(source) > max_length:
+            raise FeedError(f'The source name is limited to {max_length} characters')
+        self.source = source
+        self.batch_size = max(1, batch_size)
+        self.stats = {
+            'records': 0,
+            'created': 0,
+            'updated': 0,
+            'unchanged': 0,
+            'invalid': 0,
+            'errors': [],
+        }
+
+    def run(self, records):
+        """
+        Import ``(record number, record)`` pairs, e.g. from ``read_records``.
+
+        Returns the stats: record counts per outcome, the first invalid
+        records with their errors, the duration and rows per second.
+        """
+        start = time.perf_counter()
+        batch = {}
+        for number, record in records:
+            self.stats['records'] += 1
+            try:
+                external_id, values = record_values(record)
+            except ValidationError as error:
+                self.add_error(number, error)
+                continue
+            # A listing repeated in the feed: the last record wins
+            batch[external_id] = (number, values, record_hash(values))
+            if len(batch) >= self.batch_size:
+                self.import_batch(batch)
+                batch = {}
+        if batch:
+            self.import_batch(batch)
+
+        seconds = time.perf_counter() - start
+        self.stats['seconds'] = round(seconds, 3)
+        self.stats['rows_per_second'] = round(self.stats['records'] / seconds) if seconds else None
+        return self.stats
+
+    def add_error(self, number, error):
+        self.stats['invalid'] += 1
+        if len(self.stats['errors']) < MAX_REPORTED_ERRORS:
+            self.stats['errors'].append({'record': number, 'error': ' '.join(error.messages)})
+
+    def import_batch(self, batch):
+        existing = {
+            external_id: (pk, import_hash)
+            for external_id, pk, import_hash in Property.objects.filter(
+                external_source=self.source, external_id__in=list(batch)
+            ).values_list('external_id', 'pk', 'import_hash')
+        }
+
+        new, changed = [], {}
+        for external_id, (number, values, digest) in batch.items():
+            known = existing.get(external_id)
+            if known is not None and known[1] == digest:
+                self.stats['unchanged'] += 1
+                continue
+            try:
+                cleaned = clean_values(values, creating=known is None)
+            except ValidationError as error:
+                self.add_error(number, error)
+                continue
+            if known is None:
+                new.append(Property(
+                    external_source=self.source,
+                    external_id=external_id,
+                    import_hash=digest,
+                    **cleaned
+                ))
+            else:
+                changed[known[0]] = (digest, cleaned)
+
+        updated = self.prepare_updates(changed)
+        if not new and not updated:
+            return
+
+        for attempt in range(SLUG_ATTEMPTS):
+            Property.assign_slugs(new)
+            try:
+                with transaction.atomic():
+                    self.write(new, updated)
+                break
+            except IntegrityError:
+                # Most likely a slug taken concurrently: allocate again
+                if attempt == SLUG_ATTEMPTS - 1:
+                    raise
+                for prop in new:
+                    prop.slug = ''
+                    prop.pk = None
+
+        self.stats['created'] += len(new)
+        self.stats['updated'] += len(updated)
+
+    def prepare_updates(self, changed):
+        """Load the changed listings and apply their new values."""
+        updated = []
+        now = timezone.now()
+        for pk, prop in Property.objects.in_bulk(list(changed)).items():
+            digest, cleaned = changed[pk]
+            for name, value in cleaned.items():
+                setattr(prop, name, value)
+            prop.import_hash = digest
+            prop.updated_at = now
+            updated.append(prop)
+        return updated
+
+    def write(self, new, updated):
+        for prop in new:
+            prop.populate_search_fields()
+        Property.objects.bulk_create(new, batch_size=self.batch_size)
+        created_pks = [prop.pk for prop in new]
+        if None in created_pks:
+            # Backends that cannot return the inserted ids
+            created_pks = list(Property.objects.filter(
+                external_source=self.source,
+                external_id__in=[prop.external_id for prop in new]
+            ).values_list('pk', flat=True))
+
+        if updated:
+            for prop in updated:
+                prop.populate_search_fields()
+            fields = list(IMPORT_FIELDS) + list(Property.NORMALIZED_FIELDS.values()) + [
+                'geohash', 'import_hash', 'updated_at'
+            ]
+            Property.objects.bulk_update(updated, fields, batch_size=self.batch_size)
+
+        properties_bulk_changed.send(
+            sender=Property,
+            created=created_pks,
+            updated=[prop.pk for prop in updated]
+        )
@@ -0,0 +1,235 @@
+"""
+Typo-tolerant location matching.
+
+Keeps an in-memory trigram index over the distinct normalized locations in
+the catalogue (``Property.location_norm``, plus each comma-separated part of
+it) and the spellings seeded from ``ALBANIAN_LOCATION_VARIATIONS``. A query is
+expanded into the known locations within a small edit-distance budget.
+
+Lookups only verify candidates that share enough trigrams with the query and
+have a compatible length, and use a bit-parallel edit distance, which keeps
+them well under a millisecond for vocabularies of 10k+ locations.
+"""
+
+import threading
+import time
+
+
+# Seconds after which the index is rebuilt from the database, so that
+# changes made by other processes are eventually picked up
+REBUILD_INTERVAL = 300
+
+# Maximum number of fuzzy matches returned for a single term
+MAX_MATCHES = 5
+
+
+def max_edit_distance(term):
+    """Edit-distance budget for a term: longer terms tolerate more typos."""
+    length = len(term)
+    if length <= 3:
+        return 0
+    if length <= 7:
+        return 1
+    return 2
+
+
+def trigrams(term):
+    """Set of padded character trigrams for a term."""
+    padded = f'^{term}$'
+    if len(padded) < 3:
+        return {padded}
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _pattern_masks(pattern):
+    masks = {}
+    for i, char in enumerate(pattern):
+        masks[char] = masks.get(char, 0) | (1 << i)
+    return masks
+
+
+def edit_distance(pattern, text, masks=None):
+    """
+    Levenshtein distance between two strings.
+
+    Uses Myers' bit-parallel algorithm: one pass over ``text`` with a handful
+    of integer operations per character. ``masks`` may be passed in when the
+    same pattern is compared against many texts.
+    """
+    length = len(pattern)
+    if length == 0:
+        return len(text)
+    if masks is None:
+        masks = _pattern_masks(pattern)
+
+    all_bits = (1 << length) - 1
+    last_bit = 1 << (length - 1)
+    positive = all_bits
+    negative = 0
+    score = length
+
+    for char in text:
+        eq = masks.get(char, 0)
+        xv = eq | negative
+        xh = (((eq & positive) + positive) ^ positive) | eq
+        hp = negative | (~(xh | positive) & all_bits)
+        hn = positive & xh
+        if hp & last_bit:
+            score += 1
+        elif hn & last_bit:
+            score -= 1
+        hp = ((hp << 1) | 1) & all_bits
+        hn = (hn << 1) & all_bits
+        positive = hn | (~(xv | hp) & all_bits)
+        negative = hp & xv
+
+    return score
+
+
+class LocationMatcher:
+    """Trigram index over a vocabulary of normalized location names."""
+
+    def __init__(self, vocabulary=()):
+        self._words = []
+        self._word_ids = {}
+        self._grams = []
+        # (trigram, word length) -> list of word ids
+        self._postings = {}
+        for word in vocabulary:
+            self.add(word)
+
+    def __len__(self):
+        return len(self._words)
+
+    def __contains__(self, word):
+        return word in self._word_ids
+
+    def add(self, word):
+        """Add a normalized word to the index (no-op if already present)."""
+        if not word or word in self._word_ids:
+            return
+        word_id = len(self._words)
+        grams = trigrams(word)
+        self._words.append(word)
+        self._word_ids[word] = word_id
+        self._grams.append(grams)
+        length = len(word)
+        for gram in grams:
+            self._postings.setdefault((gram, length), []).append(word_id)
+
+    def match(self, term, max_distance=None):
+        """
+        Find indexed words within ``max_distance`` edits of ``term``.
+
+        Returns a list of ``(distance, word)`` tuples, closest first.
+        """
+        if max_distance is None:
+            max_distance = max_edit_distance(term)
+        if max_distance == 0:
+            return [(0, term)] if term in self._word_ids else []
+
+        term_grams = trigrams(term)
+        lengths = range(len(term) - max_distance, len(term) + max_distance + 1)
+        # Each edit destroys at most three trigrams of the term
+        min_shared = len(term_grams) - 3 * max_distance
+
+        if min_shared > 0:
+            # A match must share at least min_shared trigrams, so it has to
+            # appear in at least one of the (n - min_shared + 1) rarest ones
+            postings = self._postings
+            ordered = sorted(
+                term_grams,
+                key=lambda gram: sum(len(postings.get((gram, length), ())) for length in lengths)
+            )
+            candidates = set()
+            for gram in ordered[:len(term_grams) - min_shared + 1]:
+                for length in lengths:
+                    candidates.update(postings.get((gram, length), ()))
+        else:
+            candidates = [
+                word_id for word_id, word in enumerate(self._words)
+                if len(word) in lengths
+            ]
+
+        masks = _pattern_masks(term)
+        matches = []
+        for word_id in candidates:
+            if min_shared > 0 and len(term_grams & self._grams[word_id]) < min_shared:
+                continue
+            word = self._words[word_id]
+            distance = edit_distance(term, word, masks)
+            if distance <= max_distance:
+                matches.append((distance, word))
+
+        matches.sort()
+        return matches
+
+
+def location_terms(location):
+    """Index terms for a normalized location: the full value and its parts."""
+    if not location:
+        return []
+    terms = [location]
+    parts = [part.strip() for part in location.split(',')]
+    terms.extend(part for part in parts if part and part != location)
+    return terms
+
+
+def build_matcher():
+    """Build a matcher from the seed variations and the catalogue locations."""
+    from .models import Property
+    from .search_utils import ALBANIAN_LOCATION_VARIATIONS
+
+    matcher = LocationMatcher()
+    for base, variations in ALBANIAN_LOCATION_VARIATIONS.items():
+        matcher.add(base)
+        for variation in variations:
+            matcher.add(variation)
+
+    locations = Property.objects.exclude(location_norm='').values_list(
+        'location_norm', flat=True
+    ).distinct()
+    for location in locations:
+        for term in location_terms(location):
+            matcher.add(term)
+    return matcher
+
+
+_matcher = None
+_built_at = 0.0
+_lock = threading.Lock()
+
+
+def get_matcher():
+    """Return the process-wide matcher, building it on first use."""
+    global _matcher, _built_at
+    matcher = _matcher
+    if matcher is not None and time.monotonic() - _built_at < REBUILD_INTERVAL:
+        return matcher
+    with _lock:
+        if _matcher is None or time.monotonic() - _built_at >= REBUILD_INTERVAL:
+            _matcher = build_matcher()
+            _built_at = time.monotonic()
+        return _matcher
+
+
+def add_location(location):
+    """Add a saved property's normalized location to the live index."""
+    matcher = _matcher
+    if matcher is None:
+        return
+    with _lock:
+        for term in location_terms(location):
+            matcher.add(term)
+
+
+def invalidate():
+    """Drop the index so it is rebuilt from the database on next use."""
+    global _matcher
+    with _lock:
+        _matcher = None
+
+
+def fuzzy_matches(term):
+    """Known locations within the edit-distance budget of a normalized term."""
+    return [word for _, word in get_matcher().match(term)[:MAX_MATCHES]]
@@ -0,0 +1,89 @@
+"""
+Management command to fill in the width and height of property images.
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Q
+
+from realestate.image_processing import IMAGE_ERRORS
+from realestate.models import PropertyImage
+from realestate.signals import images_bulk_updated
+
+
+def read_dimensions(image):
+    try:
+        return image.read_dimensions()
+    except IMAGE_ERRORS as error:
+        return error
+
+
+class Command(BaseCommand):
+    help = 'Read the width and height of property images that have none from their file headers'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Re-read every image, e.g. to apply EXIF rotation to dimensions recorded before'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=8,
+            help='Headers read in parallel (default: 8)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Images updated per query (default: 500)'
+        )
+
+    def handle(self, *args, **options):
+        images = PropertyImage.objects.exclude(image='').only(
+            'id', 'property_id', 'image', 'width', 'height'
+        ).order_by('pk')
+        if not options['all']:
+            images = images.filter(Q(width__isnull=True) | Q(height__isnull=True))
+        total = images.count()
+        self.stdout.write(f'Reading the dimensions of {total} images')
+
+        batch_size = max(1, options['batch_size'])
+        updated = failed = 0
+        last_pk = 0
+        start = time.perf_counter()
+        # Reading headers is I/O bound (local disk or remote storage), so
+        # threads are enough to overlap the reads
+        with ThreadPoolExecutor(max_workers=max(1, options['workers'])) as executor:
+            while True:
+                batch = list(images.filter(pk__gt=last_pk)[:batch_size])
+                if not batch:
+                    break
+                last_pk = batch[-1].pk
+
+                changed = []
+                for image, result in zip(batch, executor.map(read_dimensions, batch)):
+                    if isinstance(result, Exception):
+                        failed += 1
+                        self.stderr.write(f'Image {image.pk} ({image.image.name}): {result}')
+                    elif result != (image.width, image.height):
+                        image.width, image.height = result
+                        changed.append(image)
+
+                if changed:
+                    with transaction.atomic():
+                        PropertyImage.objects.bulk_update(changed, ['width', 'height'])
+                    images_bulk_updated.send(
+                        sender=PropertyImage, property_ids=[image.property_id for image in changed]
+                    )
+                    updated += len(changed)
+
+        elapsed = time.perf_counter() - start
+        self.stdout.write(self.style.SUCCESS(
+            f'Updated {updated} of {total} images in {elapsed:.1f}s'
+            f' ({total / elapsed if elapsed else 0:,.0f} images/s), {failed} failed'
+        ))
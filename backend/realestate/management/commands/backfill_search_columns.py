@@ -0,0 +1,57 @@
+"""
+Management command to backfill the normalized search columns and geohashes.
+"""
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from realestate import search_index
+from realestate.models import Property
+
+
+class Command(BaseCommand):
+    help = 'Recompute normalized search columns and geohashes and rebuild the full-text index'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Number of properties to update per query (default: 500)'
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        source_fields = [*Property.NORMALIZED_FIELDS, 'latitude', 'longitude']
+        norm_fields = [*Property.NORMALIZED_FIELDS.values(), 'geohash']
+
+        queryset = Property.objects.only('id', *source_fields, *norm_fields).order_by('pk')
+        updated = 0
+        batch = []
+
+        for property_obj in queryset.iterator(chunk_size=batch_size):
+            before = [getattr(property_obj, field) for field in norm_fields]
+            property_obj.populate_search_fields()
+            if [getattr(property_obj, field) for field in norm_fields] != before:
+                batch.append(property_obj)
+            if len(batch) >= batch_size:
+                updated += self._flush(batch, norm_fields)
+                batch = []
+        updated += self._flush(batch, norm_fields)
+
+        self.stdout.write(f'  Updated normalized columns and geohashes on {updated} properties')
+
+        search_index.rebuild()
+        if connection.vendor == 'sqlite':
+            # Refresh the planner statistics so that SQLite picks the
+            # geohash and partial listing indexes over listing_status
+            with connection.cursor() as cursor:
+                cursor.execute(f'ANALYZE {Property._meta.db_table}')
+        self.stdout.write(self.style.SUCCESS('Search columns and full-text index are up to date'))
+
+    def _flush(self, batch, fields):
+        if not batch:
+            return 0
+        with transaction.atomic():
+            Property.objects.bulk_update(batch, fields)
+        return len(batch)
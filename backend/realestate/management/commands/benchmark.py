@@ -0,0 +1,428 @@
+"""
+Management command with micro-benchmarks for performance-sensitive code paths.
+"""
+
+import io
+import random
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Q
+from django.test import RequestFactory
+from PIL import Image as PILImage
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+
+from realestate import geo, image_pipeline
+from realestate.image_processing import VARIANT_SIZES, render_variants
+from realestate.location_index import LocationMatcher
+from realestate.management.utils import allowed_host
+from realestate.models import Property, PropertyImage
+from realestate.renderers import ORJSONRenderer, orjson
+from realestate.serializers import FastPropertyListSerializer, PropertyListSerializer
+
+
+# Syllable parts used to generate plausible (Albanian-looking) location names
+ONSETS = [
+    '', 'b', 'd', 'dh', 'f', 'g', 'gj', 'k', 'l', 'll', 'm', 'n', 'p', 'q',
+    'r', 'rr', 's', 'sh', 't', 'th', 'v', 'x', 'xh', 'z', 'zh', 'kr', 'pr',
+]
+VOWELS = ['a', 'e', 'i', 'o', 'u', 'y', 'ie']
+CODAS = ['', '', '', 'n', 'r', 's', 'k', 'l', 't', 'sh']
+
+# Rough bounding box of Albania (west, south, east, north)
+ALBANIA_BBOX = (19.0, 39.6, 21.1, 42.7)
+
+
+class Rollback(Exception):
+    """Raised to roll back the synthetic rows of a database benchmark."""
+
+
+class Command(BaseCommand):
+    help = 'Run micro-benchmarks (targets: location_matcher, geo, serializer, renderer, image_variants)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'target',
+            help='Benchmark to run: location_matcher, geo, serializer, renderer, image_variants'
+        )
+        parser.add_argument(
+            '--size',
+            type=int,
+            default=10000,
+            help='Size of the synthetic dataset (default: 10000)'
+        )
+        parser.add_argument(
+            '--queries',
+            type=int,
+            default=1000,
+            help='Number of queries to time (default: 1000)'
+        )
+        parser.add_argument(
+            '--images',
+            type=int,
+            default=24,
+            help='Number of synthetic photos for image_variants (default: 24)'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=image_pipeline.worker_count(),
+            help='Rendering processes for image_variants (default: REALESTATE_IMAGE_WORKERS)'
+        )
+        parser.add_argument('--seed', type=int, default=42, help='Random seed')
+
+    def handle(self, *args, **options):
+        handler = getattr(self, f'bench_{options["target"]}', None)
+        if handler is None:
+            raise CommandError(f'Unknown benchmark target: {options["target"]}')
+        random.seed(options['seed'])
+        handler(options)
+
+    def report_timings(self, label, timings):
+        """Print mean/p50/p95/max of a list of durations in seconds."""
+        timings = sorted(timings)
+        p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+        self.stdout.write(
+            f'  {label}: mean {statistics.mean(timings) * 1e6:.1f}us, '
+            f'p50 {timings[len(timings) // 2] * 1e6:.1f}us, '
+            f'p95 {p95 * 1e6:.1f}us, max {timings[-1] * 1e6:.1f}us'
+        )
+
+    # =========================================================================
+    # Location matcher
+    # =========================================================================
+
+    def bench_location_matcher(self, options):
+        size = options['size']
+        vocabulary = set()
+        while len(vocabulary) < size:
+            name = ''.join(
+                random.choice(ONSETS) + random.choice(VOWELS) + random.choice(CODAS)
+                for _ in range(random.randint(2, 4))
+            )
+            vocabulary.add(name)
+        vocabulary = sorted(vocabulary)
+
+        start = time.perf_counter()
+        matcher = LocationMatcher(vocabulary)
+        build_time = time.perf_counter() - start
+        self.stdout.write(
+            f'Location matcher: {len(matcher)} locations, built in {build_time * 1e3:.1f}ms'
+        )
+
+        # Queries with one random substitution, plus some unknown terms
+        queries = []
+        for word in random.sample(vocabulary, min(options['queries'], len(vocabulary))):
+            chars = list(word)
+            chars[random.randrange(len(chars))] = random.choice('abcdefghijklmnopqrstuvwxyz')
+            queries.append(''.join(chars))
+
+        timings = []
+        found = 0
+        for query in queries:
+            start = time.perf_counter()
+            matches = matcher.match(query)
+            timings.append(time.perf_counter() - start)
+            found += bool(matches)
+
+        self.report_timings('match', timings)
+        self.stdout.write(self.style.SUCCESS(
+            f'{found}/{len(queries)} misspelled queries matched a known location'
+        ))
+
+    # =========================================================================
+    # Geospatial search
+    # =========================================================================
+
+    def bench_geo(self, options):
+        """
+        Time bbox and radius queries on ``--size`` synthetic published
+        properties, inserted in a transaction that is rolled back afterwards.
+        """
+        try:
+            with transaction.atomic():
+                self._bench_geo(options)
+                raise Rollback
+        except Rollback:
+            pass
+
+    def _bench_geo(self, options):
+        size = options['size']
+        west, south, east, north = ALBANIA_BBOX
+
+        start = time.perf_counter()
+        batch = []
+        for index in range(size):
+            latitude = round(random.uniform(south, north), 6)
+            longitude = round(random.uniform(west, east), 6)
+            batch.append(Property(
+                title=f'Benchmark {index}',
+                slug=f'benchmark-geo-{index}',
+                price=random.randint(500, 900000),
+                location_text='Benchmark',
+                size_sqm=random.randint(20, 400),
+                description='Benchmark',
+                listing_status=Property.ListingStatus.PUBLISHED,
+                latitude=latitude,
+                longitude=longitude,
+                geohash=geo.encode_geohash(latitude, longitude),
+            ))
+        Property.objects.bulk_create(batch, batch_size=2000)
+        with connection.cursor() as cursor:
+            cursor.execute(f'ANALYZE {Property._meta.db_table}')
+        self.stdout.write(
+            f'Geo: {size} synthetic properties inserted in {time.perf_counter() - start:.1f}s'
+        )
+
+        published = Property.objects.filter(listing_status=Property.ListingStatus.PUBLISHED)
+        queries = min(options['queries'], 200)
+
+        def random_box(span):
+            box_west = random.uniform(west, east - span)
+            box_south = random.uniform(south, north - span)
+            return box_west, box_south, box_west + span, box_south + span
+
+        def run_list_queries(queryset):
+            # What the list endpoint runs: the count and the first page
+            count = queryset.count()
+            list(queryset.order_by('-created_at').values_list('pk', flat=True)[:12])
+            return count
+
+        for span in (0.05, 0.2):
+            indexed, plain = [], []
+            for _ in range(queries):
+                box = random_box(span)
+                box_west, box_south, box_east, box_north = box
+                start = time.perf_counter()
+                found = run_list_queries(published.filter(geo.bbox_filter(box)))
+                indexed.append(time.perf_counter() - start)
+
+                start = time.perf_counter()
+                expected = run_list_queries(published.filter(
+                    Q(latitude__gte=box_south, latitude__lte=box_north) &
+                    Q(longitude__gte=box_west, longitude__lte=box_east)
+                ))
+                plain.append(time.perf_counter() - start)
+                if found != expected:
+                    raise CommandError(f'bbox results differ for {box}: {found} != {expected}')
+            self.stdout.write(f'bbox {span}° x {span}° (count + first page):')
+            self.report_timings('geohash index', indexed)
+            self.report_timings('lat/lon range scan', plain)
+
+        for radius_km in (2, 10):
+            timings = []
+            for _ in range(queries):
+                latitude = random.uniform(south, north)
+                longitude = random.uniform(west, east)
+                start = time.perf_counter()
+                run_list_queries(geo.filter_near(published, latitude, longitude, radius_km))
+                timings.append(time.perf_counter() - start)
+            self.stdout.write(f'radius {radius_km}km (box prefilter + haversine, count + first page):')
+            self.report_timings('near', timings)
+
+    # =========================================================================
+    # List serialization
+    # =========================================================================
+
+    def bench_serializer(self, options):
+        """
+        Compare PropertyListSerializer and FastPropertyListSerializer on pages
+        of 100 of ``--size`` synthetic published properties with images,
+        inserted in a transaction that is rolled back afterwards. Fails if
+        the two produce different JSON.
+        """
+        try:
+            with transaction.atomic():
+                self._bench_serializer(options)
+                raise Rollback
+        except Rollback:
+            pass
+
+    def insert_listings(self, size, label):
+        """Insert ``size`` published properties with 0-3 images; return their ids."""
+        start = time.perf_counter()
+        Property.objects.bulk_create([
+            Property(
+                title=f'Benchmark {index}',
+                slug=f'benchmark-{label}-{index}',
+                status=random.choice(Property.Status.values),
+                price=f'{random.randint(500, 900000)}.{random.randint(0, 99):02d}',
+                location_text='Benchmark',
+                size_sqm=random.randint(20, 400),
+                bedrooms=random.randint(0, 6),
+                description='Benchmark',
+                listing_status=Property.ListingStatus.PUBLISHED,
+            )
+            for index in range(size)
+        ], batch_size=2000)
+        ids = list(Property.objects.filter(
+            slug__startswith=f'benchmark-{label}-'
+        ).order_by('pk').values_list('pk', flat=True))
+        PropertyImage.objects.bulk_create([
+            PropertyImage(property_id=pk, image=f'properties/benchmark-{pk}-{order}.jpg', sort_order=order)
+            for pk in ids
+            for order in random.sample(range(5), random.randint(0, 3))
+        ], batch_size=2000)
+        self.stdout.write(
+            f'{size} synthetic properties inserted in {time.perf_counter() - start:.1f}s'
+        )
+        return ids
+
+    def _bench_serializer(self, options):
+        page_size = 100
+        ids = self.insert_listings(options['size'], 'serializer')
+
+        request = Request(RequestFactory(SERVER_NAME=allowed_host()).get('/api/properties/'))
+        renderer = JSONRenderer()
+        queryset = Property.objects.filter(pk__in=ids).order_by('pk')
+        pages = [ids[index:index + page_size] for index in range(0, len(ids), page_size)]
+        pages = random.sample(pages, min(len(pages), options['queries'] // 10 or 1))
+
+        drf, fast = [], []
+        for page in pages:
+            page_queryset = queryset.filter(pk__gte=page[0], pk__lte=page[-1])
+
+            start = time.perf_counter()
+            expected = PropertyListSerializer(
+                page_queryset.with_cover_image(), many=True, context={'request': request}
+            ).data
+            drf.append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            serializer = FastPropertyListSerializer(request)
+            data = serializer.serialize(list(page_queryset.values(*serializer.columns())))
+            fast.append(time.perf_counter() - start)
+
+            if renderer.render(data) != renderer.render(expected):
+                raise CommandError(f'Serializers differ on the page starting at id {page[0]}')
+
+        rows = sum(len(page) for page in pages)
+        self.stdout.write(f'{len(pages)} pages of {page_size} rows (query + serialization), identical JSON:')
+        for label, timings in (('PropertyListSerializer', drf), ('FastPropertyListSerializer', fast)):
+            self.stdout.write(f'  {label}: {rows / sum(timings):,.0f} rows/s')
+            self.report_timings('per page', timings)
+
+    # =========================================================================
+    # JSON rendering
+    # =========================================================================
+
+    def bench_renderer(self, options):
+        """
+        Compare JSONRenderer and ORJSONRenderer on list pages of 100
+        synthetic properties, inserted in a transaction that is rolled back
+        afterwards. Fails if the two produce different bytes.
+        """
+        try:
+            with transaction.atomic():
+                self._bench_renderer(options)
+                raise Rollback
+        except Rollback:
+            pass
+
+    def _bench_renderer(self, options):
+        if orjson is None:
+            raise CommandError('orjson is not installed: ORJSONRenderer falls back to JSONRenderer')
+        page_size = 100
+        ids = self.insert_listings(options['size'], 'renderer')
+
+        host = allowed_host()
+        request = Request(RequestFactory(SERVER_NAME=host).get('/api/properties/'))
+        queryset = Property.objects.filter(pk__in=ids).order_by('pk').with_cover_image()
+        payloads = []
+        for index in range(0, min(len(ids), page_size * 20), page_size):
+            page = ids[index:index + page_size]
+            payloads.append({
+                'count': len(ids),
+                'next': f'http://{host}/api/properties/?page=2',
+                'previous': None,
+                'results': PropertyListSerializer(
+                    queryset.filter(pk__gte=page[0], pk__lte=page[-1]),
+                    many=True, context={'request': request}
+                ).data,
+            })
+
+        renderers = (('JSONRenderer', JSONRenderer()), ('ORJSONRenderer', ORJSONRenderer()))
+        for payload in payloads:
+            rendered = {renderer.render(payload) for _, renderer in renderers}
+            if len(rendered) != 1:
+                raise CommandError('JSONRenderer and ORJSONRenderer output differ')
+
+        rounds = max(1, options['queries'] // len(payloads))
+        rows = sum(len(payload['results']) for payload in payloads) * rounds
+        self.stdout.write(f'{len(payloads)} list pages of {page_size} rows, rendered {rounds}x, identical bytes:')
+        for label, renderer in renderers:
+            timings = []
+            for _ in range(rounds):
+                for payload in payloads:
+                    start = time.perf_counter()
+                    renderer.render(payload)
+                    timings.append(time.perf_counter() - start)
+            self.stdout.write(f'  {label}: {rows / sum(timings):,.0f} rows/s')
+            self.report_timings('per page', timings)
+
+    # =========================================================================
+    # Image variants
+    # =========================================================================
+
+    def synthetic_photo(self, width=3000, height=2000):
+        """A noisy gradient JPEG (as bytes), with an EXIF orientation tag."""
+        gradient = PILImage.linear_gradient('L').resize((width, height))
+        # Low-frequency noise compresses roughly like a photo; per-pixel noise
+        # would be a worst case for every encoder
+        noise = PILImage.effect_noise((width // 8, height // 8), random.randint(20, 60)).resize(
+            (width, height), PILImage.BICUBIC
+        )
+        photo = PILImage.merge('RGB', (gradient, noise, gradient.transpose(PILImage.FLIP_LEFT_RIGHT)))
+        exif = PILImage.Exif()
+        exif[0x0112] = random.choice([1, 6])  # Orientation
+        buffer = io.BytesIO()
+        photo.save(buffer, 'JPEG', quality=90, exif=exif)
+        return buffer.getvalue()
+
+    def bench_image_variants(self, options):
+        """
+        Render the variants of synthetic 3000x2000 photos, in this process
+        and in a process pool; report throughput and output sizes.
+        """
+        photos = [self.synthetic_photo() for _ in range(max(1, options['images']))]
+        self.stdout.write(
+            f'{len(photos)} photos of 3000x2000, {statistics.mean(map(len, photos)) / 1024:,.0f} KiB on average'
+        )
+
+        timings = []
+        renderings = []
+        for photo in photos:
+            start = time.perf_counter()
+            renderings.append(render_variants(photo))
+            timings.append(time.perf_counter() - start)
+        self.stdout.write(f'  in process: {len(photos) / sum(timings):.2f} images/s')
+        self.report_timings('per image', timings)
+
+        workers = options['workers']
+        if workers > 0:
+            pool = image_pipeline.create_pool(workers)
+            try:
+                # Spawning the workers is not part of the measurement
+                list(pool.map(render_variants, photos[:workers]))
+                start = time.perf_counter()
+                list(pool.map(render_variants, photos))
+                elapsed = time.perf_counter() - start
+            finally:
+                pool.shutdown()
+            self.stdout.write(f'  pool of {workers}: {len(photos) / elapsed:.2f} images/s')
+
+        sizes = {}
+        for _, _, variants in renderings:
+            for names, width, height, encoded in variants:
+                for format, data in encoded.items():
+                    sizes.setdefault((names[0], width, height, format), []).append(len(data))
+        self.stdout.write('Average variant sizes:')
+        for (name, width, height, format), lengths in sorted(
+            sizes.items(), key=lambda item: (VARIANT_SIZES[item[0][0]], item[0][3])
+        ):
+            self.stdout.write(
+                f'  {name} {width}x{height} {format}: {statistics.mean(lengths) / 1024:,.1f} KiB'
+            )
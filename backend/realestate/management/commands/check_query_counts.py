@@ -0,0 +1,165 @@
+"""
+Management command to check how many queries the property endpoints run.
+
+Creates published properties with images (in a transaction that is rolled
+back afterwards), requests them through the public and admin list and detail
+views, and fails if any request runs more queries than its budget. List
+budgets do not depend on the page size, so a query per row (e.g. for cover
+images) fails the check.
+"""
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext, override_settings
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from realestate import caching, view_counter
+from realestate.management.utils import allowed_host
+from realestate.models import Property, PropertyImage
+from realestate.views import AdminPropertyViewSet, PublicPropertyDetailView, PublicPropertyListView
+
+
+# (description, budget)
+PUBLIC_UNCACHED = ('public detail, not cached: property, images', 2)
+PUBLIC_UNCACHED_NO_IMAGES = ('public detail with fields=id,title, not cached: property', 1)
+PUBLIC_CACHED = ('public detail, cached: property', 1)
+ADMIN_RETRIEVE = ('admin detail: property, images', 2)
+PUBLIC_LIST = ('public list of 100, not cached: property state, count, page, cover images', 4)
+PUBLIC_LIST_DRF = ('public list of 100 with PropertyListSerializer, not cached: property state, count, page', 3)
+ADMIN_LIST = ('admin list of 100: property state, count, page', 3)
+
+# Listings (each with IMAGES_PER_LISTING images) on the checked list pages
+LIST_SIZE = 100
+IMAGES_PER_LISTING = 3
+
+
+def create_list_sample():
+    """
+    Create LIST_SIZE published properties, each with IMAGES_PER_LISTING
+    images, for the list budgets (also used by the realestate tests).
+    """
+    properties = Property.objects.bulk_create([
+        Property(
+            title=f'Query count check {index}',
+            slug=f'query-count-check-{index}',
+            price=100000 + index,
+            location_text='Tirana',
+            size_sqm=80,
+            description='Query count check',
+            listing_status=Property.ListingStatus.PUBLISHED,
+            agent_name='Agent',
+        )
+        for index in range(LIST_SIZE)
+    ])
+    PropertyImage.objects.bulk_create([
+        # With dimensions, so that no (missing) file is read
+        PropertyImage(
+            property=prop, image=f'properties/check-{prop.pk}-{order}.jpg',
+            sort_order=order, width=800, height=600
+        )
+        for prop in properties
+        for order in range(IMAGES_PER_LISTING)
+    ])
+
+
+class Rollback(Exception):
+    """Raised to roll back the sample rows."""
+
+
+class Command(BaseCommand):
+    help = 'Fail if the property list and detail endpoints run more queries than expected'
+
+    def handle(self, *args, **options):
+        failures = []
+        try:
+            with transaction.atomic():
+                failures = self.check_endpoints()
+                # Views of the sample property are not kept
+                view_counter.flush()
+                raise Rollback
+        except Rollback:
+            pass
+
+        if failures:
+            raise CommandError('\n'.join(failures))
+        self.stdout.write(self.style.SUCCESS('All property endpoints are within their query budgets'))
+
+    def check_endpoints(self):
+        factory = APIRequestFactory(SERVER_NAME=allowed_host())
+        prop = Property.objects.create(
+            title='Query count check',
+            price=100000,
+            location_text='Tirana',
+            size_sqm=80,
+            description='Query count check',
+            listing_status=Property.ListingStatus.PUBLISHED,
+            agent_name='Agent',
+        )
+        for order in range(3):
+            # With dimensions, so that no (missing) file is read on save
+            PropertyImage.objects.create(
+                property=prop, image=f'properties/check-{order}.jpg', sort_order=order, width=800, height=600
+            )
+        staff = get_user_model().objects.create_user('query-count-check', is_staff=True)
+
+        public_view = PublicPropertyDetailView.as_view()
+        admin_view = AdminPropertyViewSet.as_view({'get': 'retrieve'})
+        url = f'/api/properties/{prop.slug}/'
+
+        def public(params=None):
+            return public_view(factory.get(url, params), slug=prop.slug)
+
+        def admin():
+            request = factory.get(f'/api/admin/properties/{prop.pk}/')
+            force_authenticate(request, user=staff)
+            return admin_view(request, pk=prop.pk)
+
+        failures = []
+        with override_settings(REALESTATE_RESPONSE_CACHE_TIMEOUT=0):
+            failures += self.check_budget(PUBLIC_UNCACHED, public)
+            failures += self.check_budget(PUBLIC_UNCACHED_NO_IMAGES, lambda: public({'fields': 'id,title'}))
+        # Make sure the response is cached, then measure a hit
+        caching.bump_generation(caching.property_generation_key(prop.pk))
+        public()
+        failures += self.check_budget(PUBLIC_CACHED, public)
+        failures += self.check_budget(ADMIN_RETRIEVE, admin)
+        failures += self.check_lists(factory, staff)
+        return failures
+
+    def check_lists(self, factory, staff):
+        create_list_sample()
+
+        public_view = PublicPropertyListView.as_view()
+        admin_view = AdminPropertyViewSet.as_view({'get': 'list'})
+        params = {'page_size': LIST_SIZE}
+
+        def public():
+            return public_view(factory.get('/api/properties/', params))
+
+        def admin():
+            request = factory.get('/api/admin/properties/', params)
+            force_authenticate(request, user=staff)
+            return admin_view(request)
+
+        failures = []
+        with override_settings(REALESTATE_RESPONSE_CACHE_TIMEOUT=0, REALESTATE_COUNT_CACHE_TIMEOUT=0):
+            failures += self.check_budget(PUBLIC_LIST, public)
+            with override_settings(REALESTATE_FAST_LIST_SERIALIZER=False):
+                failures += self.check_budget(PUBLIC_LIST_DRF, public)
+            failures += self.check_budget(ADMIN_LIST, admin)
+        return failures
+
+    def check_budget(self, case, request):
+        description, budget = case
+        with CaptureQueriesContext(connection) as context:
+            response = request()
+            response.render()
+        if response.status_code != 200:
+            return [f'{description}: HTTP {response.status_code}']
+        count = len(context.captured_queries)
+        self.stdout.write(f'  {description}: {count} queries (budget {budget})')
+        if count > budget:
+            queries = '\n    '.join(query['sql'] for query in context.captured_queries)
+            return [f'{description}: {count} queries, budget {budget}:\n    {queries}']
+        return []
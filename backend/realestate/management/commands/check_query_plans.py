@@ -0,0 +1,111 @@
+"""
+Management command to check that public listing queries use indexes.
+
+Builds every combination of the public list filters through
+PublicPropertyListView, runs the resulting queries, and inspects
+``EXPLAIN QUERY PLAN`` for each statement. Fails if any of them falls back to
+a full scan of the property table.
+"""
+
+import itertools
+import re
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import RequestFactory
+
+from realestate.models import Property
+from realestate.views import PublicPropertyListView
+
+
+# One representative value per public filter
+FILTER_VALUES = {
+    'status': 'BUY',
+    'q': 'tirana',
+    'location': 'tirana',
+    'min_price': '100000',
+    'max_price': '500000',
+    'bedrooms': '2',
+    'min_bedrooms': '5',
+    'min_size': '50',
+    'max_size': '150',
+    'featured': 'true',
+}
+
+ORDERINGS = ['-created_at', 'created_at', 'price', '-price']
+
+# "SCAN <table>" without "USING ... INDEX" is a full table scan
+FULL_SCAN_PATTERN = re.compile(r'^SCAN (\S+)(?! USING)( AS \S+)?$')
+
+
+class Command(BaseCommand):
+    help = 'Fail if any public listing filter combination needs a full table scan'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verbose-plans',
+            action='store_true',
+            help='Print the query plan for every combination'
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'sqlite':
+            raise CommandError('check_query_plans only supports SQLite (EXPLAIN QUERY PLAN)')
+
+        table = Property._meta.db_table
+        factory = RequestFactory()
+        failures = []
+        checked = 0
+
+        for params in self.filter_combinations():
+            statements = self.capture_statements(factory, params)
+            for sql, sql_params in statements:
+                plan = self.explain(sql, sql_params)
+                checked += 1
+                full_scans = [
+                    line for line in plan
+                    if (match := FULL_SCAN_PATTERN.match(line)) and match.group(1) == table
+                ]
+                if options['verbose_plans']:
+                    self.stdout.write(f'{params}: {"; ".join(plan)}')
+                if full_scans:
+                    failures.append((params, sql, plan))
+
+        for params, sql, plan in failures:
+            self.stderr.write(f'Full table scan for {params}:\n  {sql}\n  ' + '\n  '.join(plan))
+
+        if failures:
+            raise CommandError(f'{len(failures)} of {checked} statements scan the whole {table} table')
+        self.stdout.write(self.style.SUCCESS(f'All {checked} statements use an index'))
+
+    def filter_combinations(self):
+        """Yield query-param dicts for every filter subset and ordering."""
+        names = list(FILTER_VALUES)
+        for size in range(len(names) + 1):
+            for subset in itertools.combinations(names, size):
+                base = {name: FILTER_VALUES[name] for name in subset}
+                orderings = ORDERINGS + (['relevance'] if 'q' in base else [])
+                for ordering in orderings:
+                    yield {**base, 'ordering': ordering}
+
+    def capture_statements(self, factory, params):
+        """Run the list view's count and page queries, returning their SQL."""
+        statements = []
+
+        def record(execute, sql, sql_params, many, context):
+            statements.append((sql, sql_params))
+            return execute(sql, sql_params, many, context)
+
+        view = PublicPropertyListView()
+        view.request = view.initialize_request(factory.get('/api/properties/', params))
+        view.format_kwarg = None
+        queryset = view.get_queryset()
+        with connection.execute_wrapper(record):
+            queryset.count()
+            list(queryset[:12])
+        return statements
+
+    def explain(self, sql, sql_params):
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}', sql_params)
+            return [row[-1] for row in cursor.fetchall()]
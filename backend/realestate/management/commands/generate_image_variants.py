@@ -0,0 +1,86 @@
+"""
+Management command to generate resized variants for existing property images.
+"""
+
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from django.core.management.base import BaseCommand
+
+from realestate import image_pipeline
+from realestate.models import PropertyImage
+
+
+class Command(BaseCommand):
+    help = 'Generate resized WebP/JPEG variants for property images that have none'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Regenerate the variants of every image, not only missing ones'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=image_pipeline.worker_count(),
+            help='Rendering processes (default: REALESTATE_IMAGE_WORKERS; 0 renders in this process)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=50,
+            help='Images read and rendered per batch (default: 50)'
+        )
+
+    def handle(self, *args, **options):
+        images = PropertyImage.objects.exclude(image='').order_by('pk')
+        if not options['all']:
+            images = images.filter(variants={})
+        total = images.count()
+        self.stdout.write(f'Generating variants for {total} images')
+
+        pool = image_pipeline.create_pool(options['workers']) or ThreadPoolExecutor(max_workers=1)
+        batch_size = max(1, options['batch_size'])
+        done = failed = 0
+        last_pk = 0
+        start = time.perf_counter()
+        try:
+            while True:
+                batch = list(images.filter(pk__gt=last_pk)[:batch_size])
+                if not batch:
+                    break
+                last_pk = batch[-1].pk
+
+                # Files are read here and rendered in the pool; results are
+                # stored as they complete
+                futures = {}
+                for image in batch:
+                    try:
+                        data = image_pipeline.read_image(image)
+                    except OSError as error:
+                        failed += 1
+                        self.stderr.write(f'Image {image.pk} ({image.image.name}): {error}')
+                        continue
+                    futures[pool.submit(image_pipeline.render_variants, data)] = image
+
+                for future in as_completed(futures):
+                    image = futures[future]
+                    try:
+                        image_pipeline.store_variants(image, future.result())
+                    except (OSError, ValueError) as error:
+                        failed += 1
+                        self.stderr.write(f'Image {image.pk} ({image.image.name}): {error}')
+                        continue
+                    done += 1
+
+                elapsed = time.perf_counter() - start
+                self.stdout.write(f'  {done + failed}/{total} ({done / elapsed:.1f} images/s)')
+        finally:
+            pool.shutdown()
+
+        elapsed = time.perf_counter() - start
+        self.stdout.write(self.style.SUCCESS(
+            f'Generated variants for {done} images in {elapsed:.1f}s'
+            f' ({done / elapsed if elapsed else 0:.1f} images/s), {failed} failed'
+        ))
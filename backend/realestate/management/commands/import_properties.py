@@ -0,0 +1,53 @@
+"""
+Management command to import property listings from an external feed.
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from realestate.importer import DEFAULT_BATCH_SIZE, FORMATS, FeedError, PropertyImporter, guess_format, read_records
+
+
+class Command(BaseCommand):
+    help = 'Import or update properties from a CSV, JSON or JSON Lines feed'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Feed file')
+        parser.add_argument(
+            '--source',
+            required=True,
+            help='Name of the feed; listings are matched on (source, external_id)'
+        )
+        parser.add_argument(
+            '--format',
+            choices=FORMATS,
+            help='Feed format (default: from the file extension)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=DEFAULT_BATCH_SIZE,
+            help=f'Records written per transaction (default: {DEFAULT_BATCH_SIZE})'
+        )
+
+    def handle(self, *args, **options):
+        format = options['format'] or guess_format(options['path'])
+        if format is None:
+            raise CommandError('Cannot tell the feed format from the file name; pass --format')
+
+        try:
+            importer = PropertyImporter(options['source'], options['batch_size'])
+            with open(options['path'], 'rb') as stream:
+                stats = importer.run(read_records(stream, format))
+        except OSError as error:
+            raise CommandError(f'Cannot read {options["path"]}: {error}')
+        except FeedError as error:
+            raise CommandError(str(error))
+
+        for error in stats['errors']:
+            self.stderr.write(f'Record {error["record"]}: {error["error"]}')
+        self.stdout.write(self.style.SUCCESS(
+            f'{stats["records"]} records in {stats["seconds"]:.1f}s '
+            f'({stats["rows_per_second"] or 0:,} rows/s): '
+            f'{stats["created"]} created, {stats["updated"]} updated, '
+            f'{stats["unchanged"]} unchanged, {stats["invalid"]} invalid'
+        ))
@@ -0,0 +1,62 @@
+"""
+Management command to publish properties when their scheduled time arrives.
+"""
+
+import signal
+import threading
+
+from django.core.management.base import BaseCommand
+
+from realestate import scheduler
+
+
+class Command(BaseCommand):
+    help = (
+        'Publish scheduled draft properties as they become due. Runs until '
+        'interrupted; several instances can run side by side'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Publish the properties due now and exit (e.g. from cron)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=scheduler.DEFAULT_BATCH_SIZE,
+            help=f'Properties published per transaction (default: {scheduler.DEFAULT_BATCH_SIZE})'
+        )
+        parser.add_argument(
+            '--max-wait',
+            type=float,
+            default=scheduler.DEFAULT_MAX_WAIT,
+            help=(
+                'Longest sleep between checks in seconds; bounds how late a newly '
+                f'scheduled property can be published (default: {scheduler.DEFAULT_MAX_WAIT})'
+            )
+        )
+
+    def handle(self, *args, **options):
+        batch_size = max(1, options['batch_size'])
+        if options['once']:
+            count = scheduler.publish_due(batch_size=batch_size)
+            self.stdout.write(self.style.SUCCESS(f'Published {count} scheduled properties'))
+            return
+
+        stop = threading.Event()
+        signal.signal(signal.SIGTERM, lambda signum, frame: stop.set())
+        self.stdout.write('Publishing scheduled properties (Ctrl+C to stop)')
+        try:
+            scheduler.run(
+                batch_size=batch_size,
+                max_wait=options['max_wait'],
+                stop=stop,
+                on_publish=lambda count: self.stdout.write(
+                    self.style.SUCCESS(f'Published {count} scheduled properties')
+                )
+            )
+        except KeyboardInterrupt:
+            pass
+        self.stdout.write('Stopped')
@@ -0,0 +1,20 @@
+"""
+Helpers shared by the management commands.
+"""
+
+from django.conf import settings
+
+
+def allowed_host():
+    """
+    A host name that ``ALLOWED_HOSTS`` accepts, for requests that commands
+    build with a request factory (whose default host, ``testserver``, is
+    only allowed under the test runner).
+    """
+    for host in settings.ALLOWED_HOSTS:
+        if host == '*':
+            break
+        # '.example.com' also matches example.com itself
+        return host.lstrip('.')
+    # Also what Django allows with DEBUG and no ALLOWED_HOSTS
+    return 'localhost'
@@ -0,0 +1,233 @@
+"""
+Map data for the public property map.
+
+Zoomed-out views get server-side clusters: published properties are grouped
+by a geohash prefix whose length follows the zoom level, and each group is
+returned as one point with its count, centroid and price range.
+
+The points feed serves every published property with coordinates as one
+compact payload, either JSON arrays per column or a packed binary format.
+
+Both are cached under the map generation (``caching.MAP_GENERATION``), which
+only changes when a save or delete affects the map.
+"""
+
+import hashlib
+import json
+import math
+import struct
+import threading
+
+from django.db.models import Avg, Count, FloatField, Max, Min
+from django.db.models.functions import Cast, Substr
+
+from . import caching, geo
+from .models import Property
+
+
+MAX_ZOOM = 22
+
+# Geohash precision for each zoom level (index), giving cells of a small
+# fraction of a map tile
+ZOOM_PRECISION = [
+    1, 1, 2, 2, 3, 3, 3, 4, 4, 5, 5, 5, 6, 6, 7, 7, 7, 8, 8, 9, 9, 9, 10,
+]
+
+# Up to this precision, the clusters of the whole map are computed once per
+# zoom and cut to the requested box in memory; above it, cells are small
+# enough that each box is queried (through the geohash index) and cached
+MAX_WORLD_PRECISION = 5
+
+
+def precision_for_zoom(zoom):
+    return ZOOM_PRECISION[min(max(zoom, 0), MAX_ZOOM)]
+
+
+def compute_clusters(precision, bbox=None):
+    """Aggregate published properties by geohash prefix, in one grouped query."""
+    queryset = Property.objects.filter(
+        listing_status=Property.ListingStatus.PUBLISHED
+    ).exclude(geohash='')
+    if bbox is not None:
+        queryset = queryset.filter(geo.bbox_filter(bbox))
+
+    rows = queryset.order_by().annotate(
+        cell=Substr('geohash', 1, precision)
+    ).values('cell').annotate(
+        count=Count('pk'),
+        latitude=Avg('latitude'),
+        longitude=Avg('longitude'),
+        min_price=Min('price'),
+        max_price=Max('price'),
+        first_id=Min('pk'),
+        first_slug=Min('slug'),
+    ).order_by('cell')
+
+    clusters = []
+    for row in rows:
+        cluster = {
+            'geohash': row['cell'],
+            'count': row['count'],
+            'latitude': round(float(row['latitude']), 6),
+            'longitude': round(float(row['longitude']), 6),
+            'min_price': row['min_price'],
+            'max_price': row['max_price'],
+        }
+        if row['count'] == 1:
+            # A single property: link straight to it
+            cluster['id'] = row['first_id']
+            cluster['slug'] = row['first_slug']
+        clusters.append(cluster)
+    return clusters
+
+
+def snap_bbox(bbox, precision):
+    """Grow a box to the geohash cell grid, so that nearby views share a key."""
+    height, width = geo.cell_size(precision)
+    west, south, east, north = bbox
+    return (
+        max(math.floor(west / width) * width, -180.0),
+        max(math.floor(south / height) * height, -90.0),
+        min(math.ceil(east / width) * width, 180.0),
+        min(math.ceil(north / height) * height, 90.0),
+    )
+
+
+def _in_bbox(cluster, bbox):
+    west, south, east, north = bbox
+    if not south <= cluster['latitude'] <= north:
+        return False
+    longitude = cluster['longitude']
+    if west <= east:
+        return west <= longitude <= east
+    return longitude >= west or longitude <= east
+
+
+def get_clusters(zoom, bbox):
+    """
+    Clusters of published properties for a map view.
+
+    Clusters are returned when their centroid lies in ``bbox``
+    (``west, south, east, north``).
+    """
+    precision = precision_for_zoom(zoom)
+    # The database state also catches writes made by other processes
+    version = (caching.get_generation(caching.MAP_GENERATION), caching.property_state())
+
+    if precision <= MAX_WORLD_PRECISION:
+        key = caching.make_key('map-clusters', version, precision)
+        clusters = caching.get_cached_response('property-clusters', key)
+        if clusters is None:
+            clusters = compute_clusters(precision)
+            caching.set_cached_response('property-clusters', key, clusters)
+        return precision, [cluster for cluster in clusters if _in_bbox(cluster, bbox)]
+
+    snapped = snap_bbox(bbox, precision)
+    key = caching.make_key('map-clusters', version, precision, snapped)
+    clusters = caching.get_cached_response('property-clusters', key)
+    if clusters is None:
+        clusters = compute_clusters(precision, snapped)
+        caching.set_cached_response('property-clusters', key, clusters)
+    return precision, [cluster for cluster in clusters if _in_bbox(cluster, bbox)]
+
+
+# =============================================================================
+# Points feed
+# =============================================================================
+
+# Status codes used by the feed: index into this list
+FEED_STATUSES = [value for value, _ in Property.Status.choices]
+
+FEED_MAGIC = b'REMP'
+FEED_VERSION = 1
+
+
+class PointsFeed:
+    """
+    Prebuilt points feed payloads.
+
+    The binary layout is little-endian and unpadded:
+
+    - header: magic ``REMP``, uint8 version, uint32 point count ``n``
+    - ``n`` uint32 ids
+    - ``n`` int32 latitudes and ``n`` int32 longitudes, in microdegrees
+    - ``n`` float64 prices
+    - ``n`` uint8 status codes (index into ``FEED_STATUSES``)
+    - the slugs, UTF-8, separated by newlines
+    """
+
+    def __init__(self, rows):
+        # rows: (pk, slug, latitude, longitude, price, status), ordered by pk
+        status_codes = {value: code for code, value in enumerate(FEED_STATUSES)}
+        ids = [row[0] for row in rows]
+        slugs = [row[1] for row in rows]
+        # Coordinates have six decimal places, so microdegrees are exact
+        latitudes = [round(row[2] * 1e6) for row in rows]
+        longitudes = [round(row[3] * 1e6) for row in rows]
+        prices = [row[4] for row in rows]
+        statuses = [status_codes.get(row[5], 0) for row in rows]
+        count = len(rows)
+
+        self.json = json.dumps({
+            'count': count,
+            'statuses': FEED_STATUSES,
+            'id': ids,
+            'slug': slugs,
+            'latitude': [value / 1e6 for value in latitudes],
+            'longitude': [value / 1e6 for value in longitudes],
+            'price': prices,
+            'status': statuses,
+        }, separators=(',', ':')).encode('utf-8')
+
+        self.binary = b''.join([
+            FEED_MAGIC,
+            struct.pack('<BI', FEED_VERSION, count),
+            struct.pack(f'<{count}I', *ids),
+            struct.pack(f'<{count}i', *latitudes),
+            struct.pack(f'<{count}i', *longitudes),
+            struct.pack(f'<{count}d', *prices),
+            bytes(statuses),
+            '\n'.join(slugs).encode('utf-8'),
+        ])
+
+        self.json_etag = f'"{hashlib.sha1(self.json).hexdigest()}"'
+        self.binary_etag = f'"{hashlib.sha1(self.binary).hexdigest()}"'
+
+
+def build_points_feed():
+    """Build the feed from a single query over the published properties."""
+    rows = Property.objects.filter(
+        listing_status=Property.ListingStatus.PUBLISHED,
+        latitude__isnull=False,
+        longitude__isnull=False,
+    ).order_by('pk').values_list(
+        'pk', 'slug',
+        # Floats skip the per-row Decimal conversion
+        Cast('latitude', FloatField()), Cast('longitude', FloatField()),
+        Cast('price', FloatField()),
+        'status'
+    )
+    return PointsFeed(list(rows))
+
+
+_feed = None
+_feed_version = None
+_feed_lock = threading.Lock()
+
+
+def get_points_feed():
+    """
+    Return the process-wide points feed, rebuilding it after map changes.
+
+    Changes are seen through the map generation and, for writes made by
+    other processes when the cache is per process, ``caching.property_state``.
+    """
+    global _feed, _feed_version
+    version = (caching.get_generation(caching.MAP_GENERATION), caching.property_state())
+    if _feed is not None and _feed_version == version:
+        return _feed
+    with _feed_lock:
+        if _feed is None or _feed_version != version:
+            _feed = build_points_feed()
+            _feed_version = version
+        return _feed
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-17 04:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('realestate', '0006_notification'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='propertyimage',
+            index=models.Index(fields=['property', 'sort_order'], name='propimage_property_order_idx'),
+        ),
+    ]
@@ -0,0 +1,55 @@
+# Full-text search index for property listings:
+# an FTS5 virtual table on SQLite, a GIN tsvector expression index on PostgreSQL.
+
+from django.db import migrations, OperationalError
+
+
+SQLITE_CREATE = (
+    'CREATE VIRTUAL TABLE IF NOT EXISTS realestate_property_fts USING fts5('
+    'title, location_text, address, tokenize="unicode61 remove_diacritics 2")'
+)
+SQLITE_POPULATE = (
+    'INSERT INTO realestate_property_fts (rowid, title, location_text, address) '
+    'SELECT id, title, location_text, address FROM realestate_property'
+)
+SQLITE_DROP = 'DROP TABLE IF EXISTS realestate_property_fts'
+
+POSTGRES_CREATE = (
+    "CREATE INDEX IF NOT EXISTS realestate_property_fts_idx ON realestate_property "
+    "USING GIN (to_tsvector('simple', coalesce(\"realestate_property\".\"title\", '') || ' ' || "
+    "coalesce(\"realestate_property\".\"location_text\", '') || ' ' || "
+    "coalesce(\"realestate_property\".\"address\", '')))"
+)
+POSTGRES_DROP = 'DROP INDEX IF EXISTS realestate_property_fts_idx'
+
+
+def create_fulltext_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        try:
+            schema_editor.execute(SQLITE_CREATE)
+        except OperationalError:
+            # SQLite built without FTS5; search falls back to LIKE filters
+            return
+        schema_editor.execute(SQLITE_POPULATE)
+    elif vendor == 'postgresql':
+        schema_editor.execute(POSTGRES_CREATE)
+
+
+def drop_fulltext_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute(SQLITE_DROP)
+    elif vendor == 'postgresql':
+        schema_editor.execute(POSTGRES_DROP)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('realestate', '0007_add_property_image_order_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_fulltext_index, drop_fulltext_index),
+    ]
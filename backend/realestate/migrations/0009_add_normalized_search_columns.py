@@ -0,0 +1,76 @@
+# Generated by Django 4.2.30 on 2026-10-17 04:29
+
+from django.db import migrations, models
+
+from realestate.search_utils import normalize_text
+
+
+NORMALIZED_FIELDS = {
+    'title': 'title_norm',
+    'location_text': 'location_norm',
+    'address': 'address_norm',
+}
+
+# Rebuild the PostgreSQL full-text index over the normalized columns
+POSTGRES_DROP = 'DROP INDEX IF EXISTS realestate_property_fts_idx'
+POSTGRES_CREATE_NORM = (
+    "CREATE INDEX IF NOT EXISTS realestate_property_fts_idx ON realestate_property "
+    "USING GIN (to_tsvector('simple', coalesce(\"realestate_property\".\"title_norm\", '') || ' ' || "
+    "coalesce(\"realestate_property\".\"location_norm\", '') || ' ' || "
+    "coalesce(\"realestate_property\".\"address_norm\", '')))"
+)
+POSTGRES_CREATE_RAW = (
+    "CREATE INDEX IF NOT EXISTS realestate_property_fts_idx ON realestate_property "
+    "USING GIN (to_tsvector('simple', coalesce(\"realestate_property\".\"title\", '') || ' ' || "
+    "coalesce(\"realestate_property\".\"location_text\", '') || ' ' || "
+    "coalesce(\"realestate_property\".\"address\", '')))"
+)
+
+
+def backfill_normalized_columns(apps, schema_editor):
+    Property = apps.get_model('realestate', 'Property')
+    properties = list(Property.objects.only('id', *NORMALIZED_FIELDS))
+    for property_obj in properties:
+        for source, target in NORMALIZED_FIELDS.items():
+            max_length = Property._meta.get_field(target).max_length
+            setattr(property_obj, target, normalize_text(getattr(property_obj, source))[:max_length])
+    Property.objects.bulk_update(properties, list(NORMALIZED_FIELDS.values()), batch_size=500)
+
+
+def use_normalized_fulltext_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(POSTGRES_DROP)
+        schema_editor.execute(POSTGRES_CREATE_NORM)
+
+
+def use_raw_fulltext_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(POSTGRES_DROP)
+        schema_editor.execute(POSTGRES_CREATE_RAW)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('realestate', '0008_property_fulltext_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='property',
+            name='address_norm',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=500),
+        ),
+        migrations.AddField(
+            model_name='property',
+            name='location_norm',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=255),
+        ),
+        migrations.AddField(
+            model_name='property',
+            name='title_norm',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=255),
+        ),
+        migrations.RunPython(backfill_normalized_columns, migrations.RunPython.noop),
+        migrations.RunPython(use_normalized_fulltext_index, use_raw_fulltext_index),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 4.2.30 on 2026-10-17 04:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('realestate', '0009_add_normalized_search_columns'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='property',
+            index=models.Index(condition=models.Q(('listing_status', 'PUBLISHED')), fields=['-created_at'], name='prop_pub_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='property',
+            index=models.Index(condition=models.Q(('listing_status', 'PUBLISHED')), fields=['status', '-created_at'], name='prop_pub_status_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='property',
+            index=models.Index(condition=models.Q(('listing_status', 'PUBLISHED')), fields=['featured', '-created_at'], name='prop_pub_featured_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='property',
+            index=models.Index(condition=models.Q(('listing_status', 'PUBLISHED')), fields=['bedrooms', '-created_at'], name='prop_pub_bedrooms_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='property',
+            index=models.Index(condition=models.Q(('listing_status', 'PUBLISHED')), fields=['price'], name='prop_pub_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='property',
+            index=models.Index(condition=models.Q(('listing_status', 'PUBLISHED')), fields=['status', 'price'], name='prop_pub_status_price_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='property',
+            index=models.Index(condition=models.Q(('listing_status', 'PUBLISHED')), fields=['size_sqm'], name='prop_pub_size_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='property',
+            index=models.Index(fields=['listing_status', '-created_at'], name='prop_listing_created_idx'),
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 4.2.30 on 2026-10-17 04:52
+
+from django.db import migrations, models
+
+from realestate.geo import encode_geohash
+
+
+def backfill_geohash(apps, schema_editor):
+    Property = apps.get_model('realestate', 'Property')
+    properties = list(
+        Property.objects.filter(latitude__isnull=False, longitude__isnull=False)
+        .only('id', 'latitude', 'longitude')
+    )
+    for property_obj in properties:
+        property_obj.geohash = encode_geohash(property_obj.latitude, property_obj.longitude)
+    Property.objects.bulk_update(properties, ['geohash'], batch_size=500)
+
+
+def analyze_properties(apps, schema_editor):
+    # Without table statistics SQLite prefers the listing_status index over
+    # the geohash ranges (PostgreSQL keeps its own statistics up to date)
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute('ANALYZE realestate_property')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('realestate', '0010_add_listing_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='property',
+            name='geohash',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=12),
+        ),
+        migrations.RunPython(backfill_geohash, migrations.RunPython.noop),
+        migrations.RunPython(analyze_properties, migrations.RunPython.noop),
+    ]
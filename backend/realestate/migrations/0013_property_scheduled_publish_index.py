@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-17 05:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('realestate', '0012_property_external_id'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='property',
+            index=models.Index(condition=models.Q(('scheduled_publish_at__isnull', False)), fields=['listing_status', 'scheduled_publish_at'], name='prop_scheduled_publish_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-17 05:53
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('realestate', '0014_propertyimage_variants'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='property',
+            index=models.Index(fields=['updated_at'], name='prop_updated_idx'),
+        ),
+    ]
@@ -2,9 +2,55 @@
 Models for the Real Estate application.
 """
 
-from django.db import models
+import logging
+
+from django.db import IntegrityError, models, transaction
+from django.db.models import OuterRef, Prefetch, Q, Subquery
 from django.utils.text import slugify
-from PIL import Image as PILImage
+
+from .geo import GEOHASH_PRECISION, encode_geohash
+from .image_processing import IMAGE_ERRORS, probe_size
+from .search_utils import normalize_text
+
+
+logger = logging.getLogger(__name__)
+
+
+# Distinct titles whose slugs in use are read per query by
+# Property.allocate_slugs (keeps the OR'ed conditions within SQLite's limits)
+SLUG_BATCH_SIZE = 100
+
+# Slugs tried by Property.save before giving up on concurrent inserts
+SLUG_ATTEMPTS = 5
+
+
+def ordered_images():
+    """
+    Prefetch of a property's images in display order, for
+    ``prefetch_related`` or ``prefetch_related_objects``.
+    """
+    return Prefetch('images', queryset=PropertyImage.objects.order_by('sort_order', 'id'))
+
+
+class PropertyQuerySet(models.QuerySet):
+    """QuerySet helpers for property listings."""
+
+    def with_cover_image(self):
+        """
+        Annotate each property with the file name of its first image.
+
+        The cover image is resolved in the same SELECT through a correlated
+        subquery, so serializing a page of properties does not issue one
+        image query per row.
+        """
+        first_image = PropertyImage.objects.filter(
+            property=OuterRef('pk')
+        ).order_by('sort_order', 'id').values('image')[:1]
+        return self.annotate(cover_image_name=Subquery(first_image))
+
+    def with_images(self):
+        """Prefetch each property's images, in display order, in one query."""
+        return self.prefetch_related(ordered_images())
 
 
 class Property(models.Model):
@@ -67,35 +113,236 @@ class Property(models.Model):
         upload_to='agents/', blank=True, null=True
     )
 
+    # Accent-free, lowercased copies of the searchable text fields, filled
+    # on save so lookups can use an index instead of icontains scans
+    title_norm = models.CharField(max_length=255, blank=True, editable=False, db_index=True)
+    location_norm = models.CharField(max_length=255, blank=True, editable=False, db_index=True)
+    address_norm = models.CharField(max_length=500, blank=True, editable=False, db_index=True)
+    # Geohash of latitude/longitude (empty without coordinates), for area
+    # queries through prefix-range lookups. A plain index: SQLite only uses a
+    # partial one for OR-ed ranges when each branch repeats its condition.
+    geohash = models.CharField(max_length=GEOHASH_PRECISION, blank=True, editable=False, db_index=True)
+
+    # Listings imported from an external feed (see importer): the feed's name
+    # and its id for the listing, and a hash of the record last imported
+    external_source = models.CharField(max_length=50, blank=True, editable=False)
+    external_id = models.CharField(max_length=100, blank=True, editable=False)
+    import_hash = models.CharField(max_length=40, blank=True, editable=False)
+
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = PropertyQuerySet.as_manager()
+
+    # Source field -> normalized shadow field
+    NORMALIZED_FIELDS = {
+        'title': 'title_norm',
+        'location_text': 'location_norm',
+        'address': 'address_norm',
+    }
+
+    # Fields shown on the public map (clusters and points feed)
+    MAP_FIELDS = ('slug', 'status', 'price', 'latitude', 'longitude', 'listing_status')
+
     class Meta:
         verbose_name_plural = 'Properties'
         ordering = ['-created_at']
+        indexes = [
+            # Public listing queries always filter on PUBLISHED, then on one
+            # of status/featured/bedrooms (equality) or price/size (range),
+            # ordered by created_at or price. The partial indexes leave draft,
+            # sold and archived rows out.
+            models.Index(
+                fields=['-created_at'],
+                condition=models.Q(listing_status='PUBLISHED'),
+                name='prop_pub_created_idx'
+            ),
+            models.Index(
+                fields=['status', '-created_at'],
+                condition=models.Q(listing_status='PUBLISHED'),
+                name='prop_pub_status_created_idx'
+            ),
+            models.Index(
+                fields=['featured', '-created_at'],
+                condition=models.Q(listing_status='PUBLISHED'),
+                name='prop_pub_featured_created_idx'
+            ),
+            models.Index(
+                fields=['bedrooms', '-created_at'],
+                condition=models.Q(listing_status='PUBLISHED'),
+                name='prop_pub_bedrooms_created_idx'
+            ),
+            models.Index(
+                fields=['price'],
+                condition=models.Q(listing_status='PUBLISHED'),
+                name='prop_pub_price_idx'
+            ),
+            models.Index(
+                fields=['status', 'price'],
+                condition=models.Q(listing_status='PUBLISHED'),
+                name='prop_pub_status_price_idx'
+            ),
+            models.Index(
+                fields=['size_sqm'],
+                condition=models.Q(listing_status='PUBLISHED'),
+                name='prop_pub_size_idx'
+            ),
+            # Admin list filtered by listing status
+            models.Index(
+                fields=['listing_status', '-created_at'],
+                name='prop_listing_created_idx'
+            ),
+            # Due-queue of the scheduled publisher; only scheduled rows are
+            # indexed
+            models.Index(
+                fields=['listing_status', 'scheduled_publish_at'],
+                condition=models.Q(scheduled_publish_at__isnull=False),
+                name='prop_scheduled_publish_idx'
+            ),
+            # caching.property_state: latest updated_at and row count
+            models.Index(fields=['updated_at'], name='prop_updated_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['external_source', 'external_id'],
+                condition=~models.Q(external_id=''),
+                name='prop_external_id_unique'
+            ),
+        ]
 
     def __str__(self):
         return self.title
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the loaded map values so that a save can tell whether the
+        # public map changed
+        instance._loaded_map_values = instance._get_map_values()
+        return instance
+
+    def _get_map_values(self):
+        deferred = self.get_deferred_fields()
+        return {name: getattr(self, name) for name in self.MAP_FIELDS if name not in deferred}
+
+    def map_changed(self):
+        """Whether saving this instance changes what the public map shows."""
+        published = self.ListingStatus.PUBLISHED
+        loaded = getattr(self, '_loaded_map_values', None)
+        if loaded is None:
+            return self.listing_status == published
+        if 'listing_status' not in loaded:
+            return True
+        if published not in (loaded['listing_status'], self.listing_status):
+            return False
+        current = self._get_map_values()
+        return any(current.get(name) != value for name, value in loaded.items())
+
     def save(self, *args, **kwargs):
         if not self.slug:
-            self.slug = self._generate_unique_slug()
+            self._save_with_unique_slug(*args, **kwargs)
+            return
+        self.populate_search_fields()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            update_fields = set(update_fields)
+            for source, target in self.NORMALIZED_FIELDS.items():
+                if source in update_fields:
+                    update_fields.add(target)
+            if update_fields & {'latitude', 'longitude'}:
+                update_fields.add('geohash')
+            kwargs['update_fields'] = update_fields
         super().save(*args, **kwargs)
-
-    def _generate_unique_slug(self):
-        """Generate a unique slug from title."""
-        base_slug = slugify(self.title)
-        slug = base_slug
-        counter = 1
-        while Property.objects.filter(slug=slug).exclude(pk=self.pk).exists():
-            slug = f'{base_slug}-{counter}'
-            counter += 1
-        return slug
+        self._loaded_map_values = self._get_map_values()
+
+    def populate_search_fields(self):
+        """Fill the normalized search columns and the geohash from their source fields."""
+        for source, target in self.NORMALIZED_FIELDS.items():
+            max_length = self._meta.get_field(target).max_length
+            setattr(self, target, normalize_text(getattr(self, source))[:max_length])
+        if self.latitude is not None and self.longitude is not None:
+            self.geohash = encode_geohash(self.latitude, self.longitude)
+        else:
+            self.geohash = ''
+
+    def _save_with_unique_slug(self, *args, **kwargs):
+        """
+        Save with a slug allocated from the title.
+
+        Another process may take the same slug between allocation and insert;
+        the unique constraint then rejects the row and a fresh slug is tried.
+        """
+        for attempt in range(SLUG_ATTEMPTS):
+            self.slug = self.allocate_slugs([self.title], exclude_pk=self.pk)[0]
+            try:
+                with transaction.atomic():
+                    self.save(*args, **kwargs)
+                return
+            except IntegrityError:
+                taken = Property.objects.filter(slug=self.slug).exclude(pk=self.pk).exists()
+                self.slug = ''
+                if not taken or attempt == SLUG_ATTEMPTS - 1:
+                    raise
+
+    @classmethod
+    def allocate_slugs(cls, titles, exclude_pk=None):
+        """
+        Unique slugs for a list of titles, in order.
+
+        Repeated titles get ``-1``, ``-2``, ... suffixes after the highest one
+        already in use. The slugs in use are read in one query per
+        ``SLUG_BATCH_SIZE`` distinct titles, instead of one query per
+        collision. Uniqueness is only guaranteed against the rows committed
+        at that time: callers inserting the slugs must handle IntegrityError.
+        """
+        bases = [slugify(title) or 'property' for title in titles]
+        distinct = sorted(set(bases))
+
+        used = set()
+        for start in range(0, len(distinct), SLUG_BATCH_SIZE):
+            chunk = distinct[start:start + SLUG_BATCH_SIZE]
+            condition = Q(slug__in=chunk)
+            for base in chunk:
+                condition |= Q(slug__startswith=f'{base}-')
+            queryset = cls.objects.filter(condition)
+            if exclude_pk is not None:
+                queryset = queryset.exclude(pk=exclude_pk)
+            used.update(queryset.values_list('slug', flat=True))
+
+        # Highest suffix in use per base; the bare base counts as suffix 0
+        next_suffix = {}
+        for slug in used:
+            base, _, suffix = slug.rpartition('-')
+            if base and suffix.isascii() and suffix.isdigit():
+                next_suffix[base] = max(next_suffix.get(base, 0), int(suffix) + 1)
+            next_suffix[slug] = max(next_suffix.get(slug, 0), 1)
+
+        slugs = []
+        for base in bases:
+            suffix = next_suffix.get(base, 0)
+            slug = f'{base}-{suffix}' if suffix else base
+            # A suffixed slug can equal another title's base within the batch
+            while slug in used:
+                suffix += 1
+                slug = f'{base}-{suffix}'
+            next_suffix[base] = suffix + 1
+            used.add(slug)
+            slugs.append(slug)
+        return slugs
+
+    @classmethod
+    def assign_slugs(cls, properties):
+        """Give unique slugs to the unsaved properties without one, for bulk_create."""
+        missing = [prop for prop in properties if not prop.slug]
+        for prop, slug in zip(missing, cls.allocate_slugs([prop.title for prop in missing])):
+            prop.slug = slug
 
     @property
     def cover_image(self):
-        """Get the first image by sort_order."""
-        first_image = self.images.order_by('sort_order').first()
+        """Get the URL of the first image by sort_order."""
+        if hasattr(self, 'cover_image_name'):
+            return PropertyImage.image_url_for(self.cover_image_name)
+        first_image = self.images.order_by('sort_order', 'id').first()
         return first_image.image.url if first_image else None
 
 
@@ -112,24 +359,59 @@ class PropertyImage(models.Model):
     sort_order = models.PositiveIntegerField(default=0)
     width = models.PositiveIntegerField(null=True, blank=True)
     height = models.PositiveIntegerField(null=True, blank=True)
+    # Resized renderings, filled in the background by image_pipeline:
+    # {variant: {'width': ..., 'height': ..., 'webp': name, 'jpeg': name}}
+    variants = models.JSONField(default=dict, blank=True, editable=False)
 
     class Meta:
         ordering = ['sort_order']
+        indexes = [
+            models.Index(
+                fields=['property', 'sort_order'],
+                name='propimage_property_order_idx'
+            ),
+        ]
 
     def __str__(self):
         return f'{self.property.title} - Image {self.sort_order}'
 
+    @classmethod
+    def image_url_for(cls, name):
+        """Build the storage URL for a stored image file name."""
+        if not name:
+            return None
+        return cls._meta.get_field('image').storage.url(name)
+
     def save(self, *args, **kwargs):
-        super().save(*args, **kwargs)
-        # Extract image dimensions
-        if self.image and (not self.width or not self.height):
+        # Dimensions are read from the image header before the row is
+        # written, so a new image costs a single INSERT
+        if self.image and not (self.width and self.height):
             try:
-                with PILImage.open(self.image.path) as img:
-                    self.width = img.width
-                    self.height = img.height
-                    super().save(update_fields=['width', 'height'])
-            except Exception:
-                pass
+                self.width, self.height = self.read_dimensions()
+            except IMAGE_ERRORS as error:
+                logger.warning('Cannot read the dimensions of image %s: %s', self.image.name, error)
+            else:
+                update_fields = kwargs.get('update_fields')
+                if update_fields is not None:
+                    kwargs['update_fields'] = {*update_fields, 'width', 'height'}
+        super().save(*args, **kwargs)
+
+    def read_dimensions(self):
+        """
+        Displayed ``(width, height)`` of the image, from its header only:
+        from the uploaded file before it is stored, else through the field's
+        storage (no local path needed). Raises one of ``IMAGE_ERRORS``.
+        """
+        if self.image._committed:
+            with self.image.storage.open(self.image.name, 'rb') as stream:
+                return probe_size(stream)
+        stream = self.image.file
+        position = stream.tell()
+        try:
+            stream.seek(0)
+            return probe_size(stream)
+        finally:
+            stream.seek(position)
 
 
 class Message(models.Model):
@@ -2,19 +2,84 @@
 Custom pagination classes for the Real Estate API.
 """
 
+import base64
+import json
+from functools import partial
+
+from django.core.paginator import Paginator
+from django.db.models import Q
+from django.utils.functional import cached_property
+from rest_framework.exceptions import NotFound
 from rest_framework.pagination import PageNumberPagination
 from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from .caching import cached_count, estimated_count
+
+
+class CountingPaginator(Paginator):
+    """Django paginator that delegates counting to a callable."""
+
+    def __init__(self, object_list, per_page, count_func=None, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.count_func = count_func
+
+    @cached_property
+    def count(self):
+        if self.count_func is not None:
+            return self.count_func(self.object_list)
+        return super().count
 
 
 class StandardResultsSetPagination(PageNumberPagination):
-    """Standard pagination with page size parameter."""
+    """
+    Standard pagination with page size parameter.
+
+    Passing ``cursor`` (empty for the first page) switches to keyset
+    pagination: pages seek on ``(<ordering field>, id)`` instead of using
+    OFFSET, and no COUNT query is run. The response then only contains
+    ``next``, ``previous`` and ``results``. Orderings that are not a plain
+    model field (e.g. search relevance) fall back to page numbers.
+
+    In page-number mode the total count is cached per filter set (see
+    ``caching.cached_count``). ``count=estimate`` returns a cheap upper bound
+    instead and flags it with ``count_estimated``.
+    """
 
     page_size = 12
     page_size_query_param = 'page_size'
     max_page_size = 100
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+    count_query_param = 'count'
+
+    cursor_mode = False
+    count_estimated = False
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.cursor_mode = False
+        if self.cursor_query_param in request.query_params:
+            ordering = self.get_keyset_ordering(queryset)
+            if ordering is not None:
+                self.cursor_mode = True
+                return self.paginate_keyset(queryset, request, ordering)
+
+        self.count_estimated = request.query_params.get(self.count_query_param) == 'estimate'
+        count = estimated_count if self.count_estimated else cached_count
+        self.django_paginator_class = partial(
+            CountingPaginator,
+            count_func=lambda object_list: count(request, object_list)
+        )
+        return super().paginate_queryset(queryset, request, view=view)
 
     def get_paginated_response(self, data):
-        return Response({
+        if self.cursor_mode:
+            return Response({
+                'next': self.next_cursor_link,
+                'previous': self.previous_cursor_link,
+                'results': data
+            })
+        response = Response({
             'count': self.page.paginator.count,
             'total_pages': self.page.paginator.num_pages,
             'current_page': self.page.number,
@@ -22,3 +87,106 @@ class StandardResultsSetPagination(PageNumberPagination):
             'previous': self.get_previous_link(),
             'results': data
         })
+        if self.count_estimated:
+            response.data['count_estimated'] = True
+        return response
+
+    # =========================================================================
+    # Keyset (cursor) pagination
+    # =========================================================================
+
+    def get_keyset_ordering(self, queryset):
+        """
+        Return ``(field_name, descending)`` for the queryset's primary
+        ordering, or None if it cannot be used as a keyset.
+        """
+        ordering = queryset.query.order_by or queryset.model._meta.ordering
+        if not ordering or not isinstance(ordering[0], str):
+            return None
+        name = ordering[0]
+        descending = name.startswith('-')
+        name = name.lstrip('-')
+        concrete_fields = {field.name for field in queryset.model._meta.concrete_fields}
+        if name not in concrete_fields or queryset.model._meta.get_field(name).null:
+            return None
+        return name, descending
+
+    def paginate_keyset(self, queryset, request, ordering):
+        field_name, descending = ordering
+        self.request = request
+        self.field = queryset.model._meta.get_field(field_name)
+        page_size = self.get_page_size(request)
+        position = self.decode_cursor(request)
+
+        # Walking backwards flips the sort direction; rows are re-reversed
+        # after fetching
+        reverse = bool(position and position['reverse'])
+        walk_descending = descending != reverse
+        prefix = '-' if walk_descending else ''
+        queryset = queryset.order_by(f'{prefix}{field_name}', f'{prefix}pk')
+
+        if position:
+            value = self.field.to_python(position['value'])
+            lookup = 'lt' if walk_descending else 'gt'
+            queryset = queryset.filter(
+                Q(**{f'{field_name}__{lookup}': value}) |
+                Q(**{field_name: value, f'pk__{lookup}': position['pk']})
+            )
+
+        rows = list(queryset[:page_size + 1])
+        has_more = len(rows) > page_size
+        rows = rows[:page_size]
+        if reverse:
+            rows.reverse()
+
+        has_next = has_more if not reverse else bool(position)
+        has_previous = has_more if reverse else bool(position)
+        self.next_cursor_link = (
+            self.build_cursor_link(rows[-1], field_name, reverse=False)
+            if has_next and rows else None
+        )
+        self.previous_cursor_link = (
+            self.build_cursor_link(rows[0], field_name, reverse=True)
+            if has_previous and rows else None
+        )
+        return rows
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            padded = encoded + '=' * (-len(encoded) % 4)
+            position = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+            return {
+                'value': position['v'],
+                'pk': int(position['pk']),
+                'reverse': bool(position.get('r')),
+            }
+        except (TypeError, ValueError, KeyError, UnicodeError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, value, pk, reverse):
+        payload = {'v': value, 'pk': pk}
+        if reverse:
+            payload['r'] = 1
+        data = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+        return base64.urlsafe_b64encode(data).decode('ascii').rstrip('=')
+
+    def build_cursor_link(self, row, field_name, reverse):
+        if isinstance(row, dict):
+            value, pk = row[field_name], row['id']
+        else:
+            value, pk = getattr(row, field_name), row.pk
+        url = self.request.build_absolute_uri()
+        url = remove_query_param(url, self.page_query_param)
+        cursor = self.encode_cursor(self._cursor_value(value), pk, reverse)
+        return replace_query_param(url, self.cursor_query_param, cursor)
+
+    def _cursor_value(self, value):
+        """Serialize an ordering value so that Field.to_python can read it back."""
+        if hasattr(value, 'isoformat'):
+            return value.isoformat()
+        if isinstance(value, (int, float, bool)) or value is None:
+            return value
+        return str(value)
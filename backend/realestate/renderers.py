@@ -0,0 +1,48 @@
+"""
+Custom renderers for the Real Estate API.
+"""
+
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+
+class ORJSONRenderer(JSONRenderer):
+    """
+    JSONRenderer backed by orjson when it is installed.
+
+    Produces the same bytes as JSONRenderer, except for floats written with
+    an exponent or many leading zeros: orjson writes ``1e16`` and
+    ``0.00001`` where json writes ``1e+16`` and ``1e-05`` (the same values
+    once parsed), and for NaN and infinite floats, which orjson writes as
+    ``null`` where JSONRenderer raises ValueError under STRICT_JSON (the
+    default). Dates, times and everything orjson does not handle natively
+    (Decimal, lazy strings, ...) go through DRF's JSONEncoder, and
+    U+2028/U+2029 are escaped the same way. Falls back to JSONRenderer
+    without orjson, for indented output, with non-compact or ASCII-only
+    settings, and for data orjson rejects.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+
+        indent = self.get_indent(accepted_media_type, renderer_context or {})
+        if orjson is None or indent is not None or self.ensure_ascii or not self.compact:
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            ret = orjson.dumps(
+                data,
+                default=self.encoder_class().default,
+                option=orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS,
+            )
+        except orjson.JSONEncodeError:
+            # Integers beyond 64 bits, deep nesting, ...: let json report or
+            # handle them as before
+            return super().render(data, accepted_media_type, renderer_context)
+
+        return ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
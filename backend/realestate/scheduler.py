@@ -0,0 +1,126 @@
+"""
+Publishing of properties scheduled with ``schedule_publish``.
+
+Due drafts (``DRAFT`` with ``scheduled_publish_at`` in the past) are read from
+the ``prop_scheduled_publish_idx`` index in batches and published with one
+UPDATE per batch. Where the database supports it, each batch is claimed with
+``SELECT ... FOR UPDATE SKIP LOCKED``, so that several workers split the due
+rows between them instead of waiting on each other. Elsewhere (SQLite) the
+UPDATE repeats the due condition, so a row raced by two workers is still
+published once.
+
+``run`` sleeps until the next scheduled time rather than polling at a fixed
+rate; the sleep is capped so that schedules added meanwhile (possibly by
+another process, earlier than the one being waited for) are picked up.
+"""
+
+import threading
+
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import Property
+from .signals import properties_bulk_changed
+
+
+DEFAULT_BATCH_SIZE = 100
+
+# Longest sleep between two checks, in seconds
+DEFAULT_MAX_WAIT = 60
+
+# Fields written when a scheduled property is published
+PUBLISHED_FIELDS = ['listing_status', 'scheduled_publish_at', 'updated_at']
+
+
+def due_properties(now):
+    """Scheduled drafts due at ``now``, earliest first."""
+    return Property.objects.filter(
+        listing_status=Property.ListingStatus.DRAFT,
+        scheduled_publish_at__lte=now
+    ).order_by('scheduled_publish_at', 'pk')
+
+
+def publish_batch(now, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Publish up to ``batch_size`` due properties.
+
+    Returns the ids of the batch (without row locks this may include rows
+    another worker published first) and how many this call published.
+    """
+    if not connection.features.has_select_for_update:
+        # No row locks (SQLite): reading inside the write transaction would
+        # make concurrent workers deadlock on the lock upgrade, so read
+        # outside it and let the conditional UPDATE settle races
+        pks = list(due_properties(now).values_list('pk', flat=True)[:batch_size])
+        count = publish(now, pks)
+    else:
+        skip_locked = connection.features.has_select_for_update_skip_locked
+        with transaction.atomic():
+            pks = list(
+                due_properties(now).select_for_update(skip_locked=skip_locked)
+                .values_list('pk', flat=True)[:batch_size]
+            )
+            count = publish(now, pks)
+
+    if count:
+        properties_bulk_changed.send(
+            sender=Property, created=[], updated=pks, fields=PUBLISHED_FIELDS
+        )
+    return pks, count
+
+
+def publish(now, pks):
+    """Publish those of ``pks`` that are still due; return how many."""
+    if not pks:
+        return 0
+    return due_properties(now).filter(pk__in=pks).update(
+        listing_status=Property.ListingStatus.PUBLISHED,
+        scheduled_publish_at=None,
+        updated_at=now
+    )
+
+
+def publish_due(now=None, batch_size=DEFAULT_BATCH_SIZE):
+    """Publish every property due at ``now`` (default: the current time); return how many."""
+    now = now or timezone.now()
+    total = 0
+    while True:
+        pks, count = publish_batch(now, batch_size)
+        total += count
+        if len(pks) < batch_size:
+            return total
+
+
+def next_due():
+    """Scheduled time of the next draft to publish, or None."""
+    return Property.objects.filter(
+        listing_status=Property.ListingStatus.DRAFT,
+        scheduled_publish_at__isnull=False
+    ).order_by('scheduled_publish_at').values_list(
+        'scheduled_publish_at', flat=True
+    ).first()
+
+
+def seconds_until_next_due(max_wait=DEFAULT_MAX_WAIT):
+    """Seconds to sleep before the next check, at most ``max_wait``."""
+    due = next_due()
+    if due is None:
+        return max_wait
+    return min(max(0.0, (due - timezone.now()).total_seconds()), max_wait)
+
+
+def run(batch_size=DEFAULT_BATCH_SIZE, max_wait=DEFAULT_MAX_WAIT, stop=None, on_publish=None):
+    """
+    Publish due properties until ``stop`` (a ``threading.Event``) is set.
+
+    ``on_publish(count)`` is called after each check that published
+    something.
+    """
+    stop = stop or threading.Event()
+    while not stop.is_set():
+        count = publish_due(batch_size=batch_size)
+        if count and on_publish is not None:
+            on_publish(count)
+        # Don't keep a connection open through long sleeps
+        connection.close_if_unusable_or_obsolete()
+        stop.wait(seconds_until_next_due(max_wait))
@@ -0,0 +1,312 @@
+"""
+Full-text search index for property listings.
+
+The public ``q`` parameter is answered from a full-text index instead of
+``icontains`` scans:
+
+- SQLite: an FTS5 virtual table (``realestate_property_fts``) whose rowid is
+  the property id. It is kept in sync from the Property save/delete signals.
+- PostgreSQL: a GIN expression index over a ``tsvector`` of the searchable
+  columns. The database maintains it, so the sync hooks are no-ops.
+
+When neither is available (e.g. SQLite built without FTS5) the search falls
+back to ``build_search_filter``.
+
+The ``location`` filter is answered from the FTS5 table's location and
+address columns on SQLite, and with ``build_location_filter`` elsewhere.
+"""
+
+from django.db import connection, OperationalError
+from django.db.models import BooleanField, FloatField
+from django.db.models.expressions import RawSQL
+
+from .search_utils import (
+    build_location_filter, build_search_filter, get_search_variations, normalize_text
+)
+
+
+FTS_TABLE = 'realestate_property_fts'
+FTS_COLUMNS = ['title', 'location_text', 'address']
+LOCATION_COLUMNS = ['location_text', 'address']
+
+
+def _search_tokens(search_term):
+    """
+    Split a search term into normalized tokens with their spelling variations.
+
+    Returns a list of sets; each set holds the alternatives for one token.
+    """
+    tokens = []
+    for token in normalize_text(search_term).split():
+        if not any(char.isalnum() for char in token):
+            continue
+        tokens.append({token} | get_search_variations(token))
+    return tokens
+
+
+class FallbackSearchBackend:
+    """Search backend used when no full-text index is available."""
+
+    def is_available(self):
+        return True
+
+    def filter(self, queryset, search_term):
+        return queryset.filter(build_search_filter(search_term))
+
+    def filter_location(self, queryset, location):
+        return queryset.filter(build_location_filter(location))
+
+    def order_by_relevance(self, queryset, search_term):
+        return queryset
+
+    def index_property(self, instance):
+        pass
+
+    def index_properties(self, pks):
+        pass
+
+    def remove_property(self, pk):
+        pass
+
+    def rebuild(self):
+        pass
+
+
+class SQLiteSearchBackend(FallbackSearchBackend):
+    """FTS5-backed search for SQLite."""
+
+    _table_exists = False
+
+    def is_available(self):
+        # Only a positive answer is cached, so the index is picked up as soon
+        # as the migration creating it has run
+        if not SQLiteSearchBackend._table_exists:
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s",
+                    [FTS_TABLE]
+                )
+                SQLiteSearchBackend._table_exists = cursor.fetchone() is not None
+        return SQLiteSearchBackend._table_exists
+
+    def build_match_expression(self, search_term):
+        """
+        Build an FTS5 MATCH expression.
+
+        Every token must match; each token matches any of its spelling
+        variations as a prefix.
+        """
+        clauses = []
+        for alternatives in _search_tokens(search_term):
+            quoted = [
+                '"{}"*'.format(alt.replace('"', '""'))
+                for alt in sorted(alternatives)
+            ]
+            clauses.append('({})'.format(' OR '.join(quoted)))
+        return ' AND '.join(clauses)
+
+    def filter(self, queryset, search_term):
+        match = self.build_match_expression(search_term)
+        if not match:
+            return queryset
+        return queryset.filter(pk__in=RawSQL(
+            f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s',
+            [match]
+        ))
+
+    def build_location_match_expression(self, location):
+        """
+        Build an FTS5 MATCH expression for the ``location`` filter.
+
+        Any spelling variation of the whole term matches, as a phrase whose
+        last word may be a prefix, in the location or address column. Matches
+        therefore start on a word boundary anywhere in the field:
+        "brooklyn" matches "Williamsburg, Brooklyn" but "rook" does not.
+        """
+        variations = get_search_variations(location)
+        if not variations:
+            return ''
+        quoted = [
+            '"{}"*'.format(variation.replace('"', '""'))
+            for variation in sorted(variations)
+            if any(char.isalnum() for char in variation)
+        ]
+        if not quoted:
+            return ''
+        return '{{{}}} : ({})'.format(' '.join(LOCATION_COLUMNS), ' OR '.join(quoted))
+
+    def filter_location(self, queryset, location):
+        match = self.build_location_match_expression(location)
+        if not match:
+            return queryset
+        return queryset.filter(pk__in=RawSQL(
+            f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s',
+            [match]
+        ))
+
+    def order_by_relevance(self, queryset, search_term):
+        match = self.build_match_expression(search_term)
+        if not match:
+            return queryset
+        table = queryset.model._meta.db_table
+        # FTS5's built-in rank column is bm25(); lower is more relevant
+        rank = RawSQL(
+            f'SELECT rank FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s '
+            f'AND rowid = "{table}"."id"',
+            [match],
+            output_field=FloatField()
+        )
+        return queryset.annotate(search_rank=rank).order_by('search_rank', '-created_at')
+
+    def index_property(self, instance):
+        if not self.is_available():
+            return
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [instance.pk])
+            cursor.execute(
+                f'INSERT INTO {FTS_TABLE} (rowid, {", ".join(FTS_COLUMNS)}) '
+                f'VALUES (%s, %s, %s, %s)',
+                [instance.pk] + [getattr(instance, column) for column in FTS_COLUMNS]
+            )
+
+    def index_properties(self, pks):
+        if not self.is_available() or not pks:
+            return
+        from .models import Property
+
+        table = Property._meta.db_table
+        columns = ', '.join(FTS_COLUMNS)
+        with connection.cursor() as cursor:
+            # Chunked to stay below SQLite's limit on query parameters
+            for start in range(0, len(pks), 500):
+                chunk = list(pks[start:start + 500])
+                placeholders = ', '.join(['%s'] * len(chunk))
+                cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid IN ({placeholders})', chunk)
+                cursor.execute(
+                    f'INSERT INTO {FTS_TABLE} (rowid, {columns}) '
+                    f'SELECT id, {columns} FROM "{table}" WHERE id IN ({placeholders})',
+                    chunk
+                )
+
+    def remove_property(self, pk):
+        if not self.is_available():
+            return
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [pk])
+
+    def rebuild(self):
+        if not self.is_available():
+            return
+        from .models import Property
+
+        table = Property._meta.db_table
+        columns = ', '.join(FTS_COLUMNS)
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE}')
+            cursor.execute(
+                f'INSERT INTO {FTS_TABLE} (rowid, {columns}) '
+                f'SELECT id, {columns} FROM "{table}"'
+            )
+
+
+class PostgresSearchBackend(FallbackSearchBackend):
+    """tsvector/GIN-backed search for PostgreSQL."""
+
+    # Must match the indexed expression in the migration for the GIN index
+    # to be used. Built over the accent-free *_norm columns so that queries
+    # (normalized the same way) match regardless of diacritics.
+    VECTOR_SQL = (
+        "to_tsvector('simple', coalesce(\"{table}\".\"title_norm\", '') || ' ' || "
+        "coalesce(\"{table}\".\"location_norm\", '') || ' ' || "
+        "coalesce(\"{table}\".\"address_norm\", ''))"
+    )
+
+    def build_tsquery(self, search_term):
+        clauses = []
+        for alternatives in _search_tokens(search_term):
+            # Keep only characters that are safe inside a tsquery lexeme
+            lexemes = [
+                ''.join(char for char in alt if char.isalnum())
+                for alt in sorted(alternatives)
+            ]
+            lexemes = [lexeme for lexeme in lexemes if lexeme]
+            if lexemes:
+                clauses.append('({})'.format(' | '.join(f'{lexeme}:*' for lexeme in lexemes)))
+        return ' & '.join(clauses)
+
+    def _vector_sql(self, queryset):
+        return self.VECTOR_SQL.format(table=queryset.model._meta.db_table)
+
+    def filter(self, queryset, search_term):
+        tsquery = self.build_tsquery(search_term)
+        if not tsquery:
+            return queryset
+        return queryset.filter(RawSQL(
+            f"{self._vector_sql(queryset)} @@ to_tsquery('simple', %s)",
+            [tsquery],
+            output_field=BooleanField()
+        ))
+
+    def order_by_relevance(self, queryset, search_term):
+        tsquery = self.build_tsquery(search_term)
+        if not tsquery:
+            return queryset
+        rank = RawSQL(
+            f"ts_rank({self._vector_sql(queryset)}, to_tsquery('simple', %s))",
+            [tsquery],
+            output_field=FloatField()
+        )
+        return queryset.annotate(search_rank=rank).order_by('-search_rank', '-created_at')
+
+
+_sqlite_backend = SQLiteSearchBackend()
+_postgres_backend = PostgresSearchBackend()
+_fallback_backend = FallbackSearchBackend()
+
+
+def get_backend():
+    """Return the search backend for the configured database."""
+    if connection.vendor == 'sqlite':
+        try:
+            if _sqlite_backend.is_available():
+                return _sqlite_backend
+        except OperationalError:
+            pass
+    elif connection.vendor == 'postgresql':
+        return _postgres_backend
+    return _fallback_backend
+
+
+def search(queryset, search_term):
+    """Restrict a Property queryset to rows matching the search term."""
+    return get_backend().filter(queryset, search_term)
+
+
+def search_location(queryset, location):
+    """Restrict a Property queryset to rows whose location or address matches."""
+    return get_backend().filter_location(queryset, location)
+
+
+def order_by_relevance(queryset, search_term):
+    """Order a Property queryset by full-text relevance (BM25 on SQLite)."""
+    return get_backend().order_by_relevance(queryset, search_term)
+
+
+def index_property(instance):
+    """Add or refresh a property in the index."""
+    get_backend().index_property(instance)
+
+
+def index_properties(pks):
+    """Add or refresh many properties, written with bulk queries, in the index."""
+    get_backend().index_properties(pks)
+
+
+def remove_property(pk):
+    """Remove a property from the index."""
+    get_backend().remove_property(pk)
+
+
+def rebuild():
+    """Rebuild the whole index from the Property table."""
+    get_backend().rebuild()
@@ -3,11 +3,15 @@ Search utilities for flexible/fuzzy location matching.
 
 This module provides text normalization and Albanian location variation
 expansion to improve search results when users type different spellings.
+Spellings not covered by the static variation table are expanded through the
+typo-tolerant index in ``location_index``.
 """
 
 import unicodedata
 from django.db.models import Q
 
+from . import location_index
+
 
 def normalize_text(text):
     """
@@ -38,7 +42,8 @@ def normalize_text(text):
 
 
 # Albanian location spelling variations
-# Maps normalized base form to set of variations
+# Maps normalized base form to set of variations. These seed the fuzzy
+# location index and take precedence over its matches.
 ALBANIAN_LOCATION_VARIATIONS = {
     # Capital and major cities
     'tirana': {'tirana', 'tirane', 'tirona'},
@@ -104,9 +109,10 @@ def get_search_variations(search_term):
     """
     Get all spelling variations for a search term.
 
-    Looks up the normalized search term in the variations dictionary
-    and returns all known spellings. If not found, returns just the
-    original normalized term.
+    Known spellings from the variations dictionary are returned as-is.
+    Otherwise the normalized term is expanded with the nearest known
+    locations from the fuzzy location index (plus their own dictionary
+    variations).
 
     Args:
         search_term: The user's search input
@@ -123,16 +129,22 @@ def get_search_variations(search_term):
     if normalized in ALBANIAN_LOCATION_VARIATIONS:
         return ALBANIAN_LOCATION_VARIATIONS[normalized]
 
-    # No known variations, return just the normalized term
-    return {normalized}
+    # Expand with the closest known locations within the typo budget
+    variations = {normalized}
+    for match in location_index.fuzzy_matches(normalized):
+        variations.add(match)
+        variations |= ALBANIAN_LOCATION_VARIATIONS.get(match, set())
+
+    return variations
 
 
 def build_location_filter(search_term):
     """
     Build a Django Q object for fuzzy location matching.
 
-    Creates an OR filter that searches both location_text and address
-    fields for all variations of the search term.
+    Creates an OR filter that searches the normalized location and address
+    columns for all variations of the search term. Used where no full-text
+    index is available (see ``search_index.search_location``).
 
     Args:
         search_term: The user's location search input
@@ -148,8 +160,8 @@ def build_location_filter(search_term):
     # Build OR conditions for each variation across both fields
     q_filter = Q()
     for variation in variations:
-        q_filter |= Q(location_text__icontains=variation)
-        q_filter |= Q(address__icontains=variation)
+        q_filter |= Q(location_norm__icontains=variation)
+        q_filter |= Q(address_norm__icontains=variation)
 
     return q_filter
 
@@ -158,8 +170,8 @@ def build_search_filter(search_term):
     """
     Build a Django Q object for fuzzy search matching.
 
-    Creates an OR filter that searches title, location_text, and address
-    fields for all variations of the search term.
+    Creates an OR filter that searches the normalized title, location and
+    address columns for all variations of the search term.
 
     Args:
         search_term: The user's search query input
@@ -172,12 +184,12 @@ def build_search_filter(search_term):
     if not variations:
         return Q()
 
-    # Build OR conditions: title always uses original term,
+    # Build OR conditions: title always uses the normalized original term,
     # location fields use all variations
-    q_filter = Q(title__icontains=search_term)  # Keep title search with original term
+    q_filter = Q(title_norm__icontains=normalize_text(search_term))
 
     for variation in variations:
-        q_filter |= Q(location_text__icontains=variation)
-        q_filter |= Q(address__icontains=variation)
+        q_filter |= Q(location_norm__icontains=variation)
+        q_filter |= Q(address_norm__icontains=variation)
 
     return q_filter
@@ -2,19 +2,78 @@
 Serializers for the Real Estate API.
 """
 
+from datetime import datetime
+from decimal import Decimal
+
 from django.utils import timezone
-from rest_framework import serializers
+from django.utils.encoding import force_str
+from rest_framework import ISO_8601, serializers
+from rest_framework.settings import api_settings
+from rest_framework.permissions import SAFE_METHODS
+from .image_processing import VARIANT_FORMATS
 from .models import Property, PropertyImage, Message, Conversation, ChatMessage, BuyerSearch, Notification
 
 
+class SparseFieldsMixin:
+    """
+    Let clients pick the fields they need with the ``fields`` (or
+    ``exclude``) query parameter, a comma-separated list of field names.
+
+    Only applies to reads. Views can narrow their queryset to the same
+    selection with ``selected_fields`` and ``only_fields``.
+    """
+
+    # Serializer field -> model fields it reads, where they differ from its
+    # own name; an empty tuple means no column (annotations, relations)
+    field_sources = {}
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+        if request is None or request.method not in SAFE_METHODS:
+            return
+        selected = self.selected_fields(request.query_params)
+        for name in list(self.fields):
+            if name not in selected:
+                self.fields.pop(name)
+
+    @classmethod
+    def selected_fields(cls, params):
+        """Names of the serializer fields selected by the query parameters."""
+        available = cls.Meta.fields
+        selected = set(available)
+        for param in ('fields', 'exclude'):
+            value = params.get(param)
+            if not value:
+                continue
+            names = {name.strip() for name in value.split(',') if name.strip()}
+            unknown = names - selected if param == 'fields' else names - set(available)
+            if unknown:
+                raise serializers.ValidationError(
+                    {'error': f'Unknown {param}: {", ".join(sorted(unknown))}'}
+                )
+            selected = names if param == 'fields' else selected - names
+        return selected
+
+    @classmethod
+    def only_fields(cls, selected, extra=()):
+        """Model fields to load (for ``QuerySet.only``) for ``selected``."""
+        names = {'id', *extra}
+        for name in selected:
+            names.update(cls.field_sources.get(name, (name,)))
+        return sorted(names)
+
+
 class PropertyImageSerializer(serializers.ModelSerializer):
     """Serializer for property images."""
 
     image_url = serializers.SerializerMethodField()
+    variants = serializers.SerializerMethodField()
+    srcset = serializers.SerializerMethodField()
 
     class Meta:
         model = PropertyImage
-        fields = ['id', 'image', 'image_url', 'alt_text', 'sort_order', 'width', 'height']
+        fields = ['id', 'image', 'image_url', 'alt_text', 'sort_order', 'width', 'height', 'variants', 'srcset']
         read_only_fields = ['id', 'width', 'height', 'image_url']
 
     def get_image_url(self, obj):
@@ -25,10 +84,43 @@ class PropertyImageSerializer(serializers.ModelSerializer):
             return obj.image.url
         return None
 
-
-class PropertyListSerializer(serializers.ModelSerializer):
+    def build_url(self, name):
+        url = PropertyImage.image_url_for(name)
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request else url
+
+    def get_variants(self, obj):
+        """Resized renderings (empty until generated): size and URL per format."""
+        return {
+            name: {
+                key: self.build_url(value) if key in VARIANT_FORMATS else value
+                for key, value in variant.items()
+            }
+            for name, variant in obj.variants.items()
+        }
+
+    def get_srcset(self, obj):
+        """``srcset`` values per format, or None until the variants are generated."""
+        srcset = {}
+        for format in VARIANT_FORMATS:
+            candidates = sorted({
+                (variant['width'], variant[format])
+                for variant in obj.variants.values() if format in variant
+            })
+            if candidates:
+                srcset[format] = ', '.join(f'{self.build_url(name)} {width}w' for width, name in candidates)
+        return srcset or None
+
+
+class PropertyListSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """Serializer for property listings (minimal fields)."""
 
+    field_sources = {
+        'status_display': ('status',),
+        'listing_status_display': ('listing_status',),
+        'cover_image': (),
+    }
+
     cover_image = serializers.SerializerMethodField()
     status_display = serializers.CharField(source='get_status_display', read_only=True)
     listing_status_display = serializers.CharField(source='get_listing_status_display', read_only=True)
@@ -45,18 +137,146 @@ class PropertyListSerializer(serializers.ModelSerializer):
         ]
 
     def get_cover_image(self, obj):
-        first_image = obj.images.order_by('sort_order').first()
-        if first_image and first_image.image:
+        # Uses the cover_image_name annotation when the queryset was built
+        # with Property.objects.with_cover_image(), avoiding a query per row
+        cover_url = obj.cover_image
+        if cover_url:
             request = self.context.get('request')
             if request:
-                return request.build_absolute_uri(first_image.image.url)
-            return first_image.image.url
+                return request.build_absolute_uri(cover_url)
+            return cover_url
         return None
 
 
-class PropertyDetailSerializer(serializers.ModelSerializer):
+class FastPropertyListSerializer:
+    """
+    High-throughput equivalent of PropertyListSerializer.
+
+    Works on rows read with ``values()`` (see ``columns``) and fetches the
+    cover images of a page in one query. Choice labels, field converters and
+    the absolute media URL prefix are prepared once per instance instead of
+    once per row, and the output is the same as PropertyListSerializer's.
+    """
+
+    serializer_class = PropertyListSerializer
+
+    # Output field -> (column it is computed from, choices)
+    derived_fields = {
+        'status_display': ('status', Property.Status.choices),
+        'listing_status_display': ('listing_status', Property.ListingStatus.choices),
+    }
+
+    def __init__(self, request=None, fields=None):
+        self.request = request
+        reference = self.serializer_class(context={'request': request})
+        if fields is None:
+            fields = set(reference.fields)
+        self.fields = [name for name in self.serializer_class.Meta.fields if name in fields]
+        self.converters = {
+            name: self.converter(reference.fields[name])
+            for name in self.fields
+            if name not in self.derived_fields and name != 'cover_image'
+        }
+        # Labels are resolved per instance so that they follow the active language
+        self.labels = {
+            name: {value: force_str(label) for value, label in choices}
+            for name, (_, choices) in self.derived_fields.items()
+        }
+        self.media_prefix = request.build_absolute_uri('/')[:-1] if request else ''
+
+    @staticmethod
+    def converter(field):
+        """Function converting a column value to its output, or None to keep it."""
+        if isinstance(field, serializers.DecimalField):
+            exponent = -field.decimal_places
+
+            def convert(value):
+                # Values read from the column already have the field's scale
+                if isinstance(value, Decimal) and value.as_tuple().exponent == exponent:
+                    return f'{value:f}'
+                return field.to_representation(value)
+            return convert
+        if isinstance(field, serializers.DateTimeField):
+            output_format = getattr(field, 'format', api_settings.DATETIME_FORMAT)
+            # Resolved once instead of once per value
+            field_timezone = field.timezone if hasattr(field, 'timezone') else field.default_timezone()
+            if output_format is None or output_format.lower() != ISO_8601 or field_timezone is None:
+                return field.to_representation
+
+            def convert(value):
+                if not isinstance(value, datetime) or not timezone.is_aware(value):
+                    return field.to_representation(value)
+                value = value.astimezone(field_timezone).isoformat()
+                if value.endswith('+00:00'):
+                    value = value[:-6] + 'Z'
+                return value
+            return convert
+        if isinstance(field, (serializers.CharField, serializers.IntegerField,
+                              serializers.BooleanField, serializers.ChoiceField)):
+            return None
+        return field.to_representation
+
+    def columns(self, extra=()):
+        """Model fields to read with ``values()``."""
+        names = {'id', *extra}
+        for name in self.fields:
+            if name in self.derived_fields:
+                names.add(self.derived_fields[name][0])
+            elif name != 'cover_image':
+                names.add(name)
+        return sorted(names)
+
+    def cover_images(self, ids):
+        """Cover image URL per property id, from one query."""
+        covers = {}
+        rows = PropertyImage.objects.filter(property_id__in=ids).order_by(
+            'property_id', 'sort_order', 'id'
+        ).values_list('property_id', 'image')
+        for property_id, name in rows:
+            if property_id not in covers:
+                covers[property_id] = self.image_url(PropertyImage.image_url_for(name))
+        return covers
+
+    def image_url(self, url):
+        if url is None or self.request is None:
+            return url
+        if url.startswith('/') and not url.startswith('//'):
+            return self.media_prefix + url
+        return self.request.build_absolute_uri(url)
+
+    def serialize(self, rows):
+        """Serialize ``values()`` rows, in order."""
+        covers = {}
+        if 'cover_image' in self.fields:
+            covers = self.cover_images([row['id'] for row in rows])
+
+        output = []
+        for row in rows:
+            item = {}
+            for name in self.fields:
+                if name == 'cover_image':
+                    item[name] = covers.get(row['id'])
+                elif name in self.derived_fields:
+                    value = row[self.derived_fields[name][0]]
+                    item[name] = self.labels[name].get(value, value)
+                else:
+                    value = row[name]
+                    convert = self.converters[name]
+                    item[name] = value if convert is None or value is None else convert(value)
+            output.append(item)
+        return output
+
+
+class PropertyDetailSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """Serializer for property detail view (all fields + images)."""
 
+    field_sources = {
+        'status_display': ('status',),
+        'listing_status_display': ('listing_status',),
+        'agent_photo_url': ('agent_photo',),
+        'images': (),
+    }
+
     images = PropertyImageSerializer(many=True, read_only=True)
     status_display = serializers.CharField(source='get_status_display', read_only=True)
     listing_status_display = serializers.CharField(source='get_listing_status_display', read_only=True)
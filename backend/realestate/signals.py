@@ -1,11 +1,36 @@
 """
-Django signals for automatic notification creation.
+Django signals for automatic notification creation, search index sync and
+cache invalidation.
 """
 
-from django.db.models.signals import post_save
-from django.dispatch import receiver
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver, Signal
 
-from .models import Message, Conversation, ChatMessage, Notification
+from . import caching, location_index, search_index
+from .models import Property, PropertyImage, Message, Conversation, ChatMessage, Notification
+
+
+# Sent after a property's images were reordered with a bulk update, which
+# does not send post_save. Arguments: property_id.
+images_reordered = Signal()
+
+# Sent after images were added to a property with bulk_create, which does not
+# send post_save. Arguments: property_id.
+images_bulk_created = Signal()
+
+# Sent after the resized variants of an image were recorded with a bulk
+# update. Arguments: property_id.
+image_variants_ready = Signal()
+
+# Sent after images of several properties were updated with bulk_update.
+# Arguments: property_ids.
+images_bulk_updated = Signal()
+
+# Sent after properties were created or updated with bulk_create/bulk_update
+# or QuerySet.update, which do not send post_save. Arguments: created, updated
+# (lists of pks) and optionally fields, the names of the fields written
+# (None when unknown).
+properties_bulk_changed = Signal()
 
 
 @receiver(post_save, sender=Message)
@@ -51,3 +76,87 @@ def create_chat_message_notification(sender, instance, created, **kwargs):
                 conversation=instance.conversation,
                 action_url=f'/admin/dashboard/chats/{instance.conversation.id}'
             )
+
+
+@receiver(post_save, sender=Property)
+def index_property_for_search(sender, instance, **kwargs):
+    """Keep the search indexes in sync with the saved property."""
+    search_index.index_property(instance)
+    location_index.add_location(instance.location_norm)
+
+
+@receiver(post_delete, sender=Property)
+def remove_property_from_search(sender, instance, **kwargs):
+    """Drop a deleted property from the full-text search index."""
+    search_index.remove_property(instance.pk)
+
+
+@receiver(post_save, sender=Property)
+@receiver(post_delete, sender=Property)
+@receiver(post_save, sender=PropertyImage)
+@receiver(post_delete, sender=PropertyImage)
+@receiver(post_save, sender=Message)
+@receiver(post_delete, sender=Message)
+@receiver(post_save, sender=Notification)
+@receiver(post_delete, sender=Notification)
+def bump_cache_generation(sender, **kwargs):
+    """Invalidate cached counts and list responses for the written model."""
+    caching.bump_generation(sender)
+
+
+@receiver(post_save, sender=Property)
+@receiver(post_delete, sender=Property)
+def bump_property_cache_generation(sender, instance, **kwargs):
+    """Invalidate the cached detail response of the written property."""
+    caching.bump_generation(caching.property_generation_key(instance.pk))
+
+
+@receiver(post_save, sender=Property)
+def bump_map_cache_generation(sender, instance, **kwargs):
+    """Invalidate cached map data when a save changes the public map."""
+    if instance.map_changed():
+        caching.bump_generation(caching.MAP_GENERATION)
+
+
+@receiver(post_delete, sender=Property)
+def bump_map_cache_generation_on_delete(sender, instance, **kwargs):
+    """Invalidate cached map data when a published property is deleted."""
+    if instance.listing_status == Property.ListingStatus.PUBLISHED:
+        caching.bump_generation(caching.MAP_GENERATION)
+
+
+@receiver(post_save, sender=PropertyImage)
+@receiver(post_delete, sender=PropertyImage)
+def bump_image_property_cache_generation(sender, instance, **kwargs):
+    """Invalidate the cached detail response of the image's property."""
+    caching.bump_generation(caching.property_generation_key(instance.property_id))
+
+
+@receiver(images_reordered)
+@receiver(images_bulk_created)
+@receiver(image_variants_ready)
+def invalidate_bulk_changed_images(sender, property_id, **kwargs):
+    """Invalidate cached responses showing the property's images."""
+    caching.bump_generation(PropertyImage)
+    caching.bump_generation(caching.property_generation_key(property_id))
+
+
+@receiver(images_bulk_updated)
+def invalidate_bulk_updated_images(sender, property_ids, **kwargs):
+    """Invalidate cached responses showing the images of several properties."""
+    caching.bump_generation(PropertyImage)
+    caching.bump_generations(caching.property_generation_key(pk) for pk in set(property_ids))
+
+
+@receiver(properties_bulk_changed)
+def sync_bulk_changed_properties(sender, created, updated, fields=None, **kwargs):
+    """Index bulk-written properties and invalidate what caches them."""
+    fields = None if fields is None else set(fields)
+    if created or fields is None or fields & set(Property.NORMALIZED_FIELDS):
+        search_index.index_properties(list(created) + list(updated))
+        location_index.invalidate()
+    caching.bump_generation(Property)
+    if created or fields is None or fields & set(Property.MAP_FIELDS):
+        caching.bump_generation(caching.MAP_GENERATION)
+    # New rows have no cached detail yet
+    caching.bump_generations(caching.property_generation_key(pk) for pk in updated)
@@ -0,0 +1,41 @@
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from realestate.management.commands.check_query_counts import (
+    ADMIN_LIST, LIST_SIZE, PUBLIC_LIST, PUBLIC_LIST_DRF, create_list_sample
+)
+
+
+@override_settings(REALESTATE_RESPONSE_CACHE_TIMEOUT=0, REALESTATE_COUNT_CACHE_TIMEOUT=0)
+class PropertyListQueryCountTests(TestCase):
+    """
+    The list endpoints run a fixed number of queries whatever the page size,
+    with the same budgets as the check_query_counts command.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        create_list_sample()
+        cls.staff = get_user_model().objects.create_user('query-count-check', is_staff=True)
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def assertListQueries(self, case, url):
+        budget = case[1]
+        with self.assertNumQueries(budget):
+            response = self.client.get(url, {'page_size': LIST_SIZE})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['results']), LIST_SIZE)
+
+    def test_public_list(self):
+        self.assertListQueries(PUBLIC_LIST, '/api/properties/')
+
+    @override_settings(REALESTATE_FAST_LIST_SERIALIZER=False)
+    def test_public_list_with_list_serializer(self):
+        self.assertListQueries(PUBLIC_LIST_DRF, '/api/properties/')
+
+    def test_admin_list(self):
+        self.client.force_authenticate(user=self.staff)
+        self.assertListQueries(ADMIN_LIST, '/api/admin/properties/')
@@ -8,6 +8,9 @@ from rest_framework.routers import DefaultRouter
 from .views import (
     # Public views
     PublicPropertyListView,
+    PublicPropertyFacetsView,
+    property_clusters,
+    property_map_points,
     PublicPropertyDetailView,
     MessageCreateView,
     # Public chat views
@@ -19,6 +22,7 @@ from .views import (
     admin_login,
     admin_logout,
     admin_me,
+    admin_cache_stats,
     # Admin viewsets
     AdminPropertyViewSet,
     AdminPropertyImageViewSet,
@@ -39,6 +43,9 @@ admin_router.register(r'notifications', AdminNotificationViewSet, basename='admi
 urlpatterns = [
     # Public endpoints
     path('properties/', PublicPropertyListView.as_view(), name='property-list'),
+    path('properties/facets/', PublicPropertyFacetsView.as_view(), name='property-facets'),
+    path('properties/clusters/', property_clusters, name='property-clusters'),
+    path('properties/map-points/', property_map_points, name='property-map-points'),
     path('properties/<slug:slug>/', PublicPropertyDetailView.as_view(), name='property-detail'),
     path('messages/', MessageCreateView.as_view(), name='message-create'),
 
@@ -55,6 +62,9 @@ urlpatterns = [
     path('admin/logout/', admin_logout, name='admin-logout'),
     path('admin/me/', admin_me, name='admin-me'),
 
+    # Cache statistics
+    path('admin/cache-stats/', admin_cache_stats, name='admin-cache-stats'),
+
     # Admin CRUD endpoints
     path('admin/', include(admin_router.urls)),
 
@@ -0,0 +1,105 @@
+"""
+Write-behind buffer for property view counts.
+
+Views are counted in memory and written to ``Property.views_count`` in
+batched UPDATEs (one per distinct increment) when the oldest pending view is
+``REALESTATE_VIEW_COUNT_FLUSH_INTERVAL`` seconds old, when
+``REALESTATE_VIEW_COUNT_FLUSH_SIZE`` views are pending, and at exit. A crash
+loses at most the views of one flush window.
+
+The buffer is per process; responses show the stored count plus the views
+pending in the process that serves them.
+"""
+
+import atexit
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import F
+
+from .models import Property
+
+
+_pending = defaultdict(int)
+_pending_total = 0
+_timer = None
+_lock = threading.Lock()
+
+
+def flush_interval():
+    """Seconds views may stay pending; 0 writes every view immediately."""
+    return getattr(settings, 'REALESTATE_VIEW_COUNT_FLUSH_INTERVAL', 10)
+
+
+def flush_size():
+    """Number of pending views that triggers a flush."""
+    return getattr(settings, 'REALESTATE_VIEW_COUNT_FLUSH_SIZE', 500)
+
+
+def record(pk):
+    """
+    Count a view of a property.
+
+    Returns the property's pending views, this one included, to be added to
+    the stored ``views_count`` read before the call.
+    """
+    global _pending_total, _timer
+    with _lock:
+        _pending[pk] += 1
+        _pending_total += 1
+        pending = _pending[pk]
+        flush_now = _pending_total >= flush_size() or not flush_interval()
+        if not flush_now and _timer is None:
+            # One timer per window, started by its first pending view
+            _timer = threading.Timer(flush_interval(), _flush_from_timer)
+            _timer.daemon = True
+            _timer.start()
+    if flush_now:
+        flush()
+    return pending
+
+
+def pending_views(pk):
+    """Views of a property counted but not written yet."""
+    with _lock:
+        return _pending.get(pk, 0)
+
+
+def flush():
+    """Write the pending views to the database."""
+    global _pending, _pending_total, _timer
+    with _lock:
+        pending, _pending = _pending, defaultdict(int)
+        _pending_total = 0
+        if _timer is not None:
+            _timer.cancel()
+            _timer = None
+    if not pending:
+        return
+
+    by_increment = defaultdict(list)
+    for pk, count in pending.items():
+        by_increment[count].append(pk)
+    try:
+        for count, pks in by_increment.items():
+            Property.objects.filter(pk__in=pks).update(views_count=F('views_count') + count)
+    except Exception:
+        # Keep the views for the next flush
+        with _lock:
+            for pk, count in pending.items():
+                _pending[pk] += count
+                _pending_total += count
+        raise
+
+
+def _flush_from_timer():
+    try:
+        flush()
+    finally:
+        # The timer thread has its own database connections
+        connections.close_all()
+
+
+atexit.register(flush)
@@ -2,20 +2,31 @@
 Views for the Real Estate API.
 """
 
+from functools import partial
+
+from django.conf import settings
 from django.contrib.auth import authenticate, login, logout
-from django.db.models import Q, F
+from django.db import transaction
+from django.db.models import Case, PositiveIntegerField, Q, Value, When, prefetch_related_objects
+from django.http import Http404, HttpResponse, HttpResponseNotModified
 from django.middleware.csrf import get_token
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, parse_etags
 from django.utils import timezone
 from rest_framework import viewsets, status, generics
+from rest_framework.exceptions import ValidationError
 from rest_framework.decorators import api_view, permission_classes, action
 from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
-from rest_framework.parsers import MultiPartParser, FormParser, JSONParser
+from rest_framework.parsers import MultiPartParser, FormParser
 from dateutil import parser as date_parser
 
-from .models import Property, PropertyImage, Message, Conversation, ChatMessage, BuyerSearch, Notification
+from .models import (
+    Property, PropertyImage, Message, Conversation, ChatMessage, BuyerSearch, Notification, ordered_images
+)
 from .serializers import (
     PropertyListSerializer,
+    FastPropertyListSerializer,
     PropertyDetailSerializer,
     PropertyCreateUpdateSerializer,
     PropertyImageSerializer,
@@ -34,15 +45,26 @@ from .serializers import (
     NotificationListSerializer,
     NotificationUpdateSerializer,
 )
+from .parsers import ORJSONParser
 from .permissions import IsAdminOrStaff
 from .throttling import MessageCreateThrottle
-from .search_utils import build_location_filter, build_search_filter
+from .facets import facet_counts
+from .signals import images_bulk_created, images_reordered
+from . import bulk_actions, caching, geo, image_pipeline, importer, maps, search_index, view_counter
 
 
 # =============================================================================
 # Public API Views
 # =============================================================================
 
+def set_validators(response, etag, last_modified):
+    """Add conditional request headers; clients must revalidate every time."""
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    patch_cache_control(response, no_cache=True)
+    return response
+
+
 class PublicPropertyListView(generics.ListAPIView):
     """
     Public endpoint to list properties with filtering and search.
@@ -54,35 +76,37 @@ class PublicPropertyListView(generics.ListAPIView):
     - min_price: Minimum price
     - max_price: Maximum price
     - bedrooms: Exact number of bedrooms
+    - min_bedrooms: Minimum number of bedrooms
     - min_size: Minimum size in sqm
     - max_size: Maximum size in sqm
     - featured: true/false
-    - ordering: price, -price, created_at, -created_at
+    - bbox: west,south,east,north (degrees)
+    - near: lat,lon, with radius_km (default 5)
+    - ordering: price, -price, created_at, -created_at, relevance (with q)
+    - fields / exclude: comma-separated fields to return / leave out
     """
 
     serializer_class = PropertyListSerializer
     permission_classes = [AllowAny]
+    default_radius_km = 5
 
     def get_queryset(self):
-        # Only show PUBLISHED properties to public
-        queryset = Property.objects.filter(listing_status=Property.ListingStatus.PUBLISHED)
         params = self.request.query_params
 
+        # Load only the columns the requested fields read
+        fields = PropertyListSerializer.selected_fields(params)
+        queryset = Property.objects.only(
+            *PropertyListSerializer.only_fields(fields, extra=('price', 'created_at'))
+        )
+        if 'cover_image' in fields:
+            queryset = queryset.with_cover_image()
+        queryset = self.get_filtered_queryset(queryset)
+
         # Status filter (BUY, RENT, etc.)
         status_filter = params.get('status')
         if status_filter:
             queryset = queryset.filter(status=status_filter.upper())
 
-        # Search query (title or location with fuzzy matching)
-        search_query = params.get('q')
-        if search_query:
-            queryset = queryset.filter(build_search_filter(search_query))
-
-        # Location filter (with fuzzy matching)
-        location = params.get('location')
-        if location:
-            queryset = queryset.filter(build_location_filter(location))
-
         # Price range
         min_price = params.get('min_price')
         if min_price:
@@ -97,6 +121,10 @@ class PublicPropertyListView(generics.ListAPIView):
         if bedrooms:
             queryset = queryset.filter(bedrooms=bedrooms)
 
+        min_bedrooms = params.get('min_bedrooms')
+        if min_bedrooms:
+            queryset = queryset.filter(bedrooms__gte=min_bedrooms)
+
         # Size range
         min_size = params.get('min_size')
         if min_size:
@@ -106,20 +134,195 @@ class PublicPropertyListView(generics.ListAPIView):
         if max_size:
             queryset = queryset.filter(size_sqm__lte=max_size)
 
+        # Ordering
+        search_query = params.get('q')
+        ordering = params.get('ordering', '-created_at')
+        valid_orderings = ['price', '-price', 'created_at', '-created_at']
+        if ordering == 'relevance' and search_query:
+            queryset = search_index.order_by_relevance(queryset, search_query)
+        elif ordering in valid_orderings:
+            queryset = queryset.order_by(ordering)
+
+        return queryset
+
+    def get_filtered_queryset(self, queryset):
+        """Published properties matching the filters that are not facets."""
+        # Only show PUBLISHED properties to public
+        queryset = queryset.filter(listing_status=Property.ListingStatus.PUBLISHED)
+        params = self.request.query_params
+
+        # Search query (full-text index over title and location fields)
+        search_query = params.get('q')
+        if search_query:
+            queryset = search_index.search(queryset, search_query)
+
+        # Location filter (with fuzzy matching)
+        location = params.get('location')
+        if location:
+            queryset = search_index.search_location(queryset, location)
+
         # Featured filter
         featured = params.get('featured')
         if featured is not None:
             featured_bool = featured.lower() in ('true', '1', 'yes')
             queryset = queryset.filter(featured=featured_bool)
 
-        # Ordering
-        ordering = params.get('ordering', '-created_at')
-        valid_orderings = ['price', '-price', 'created_at', '-created_at']
-        if ordering in valid_orderings:
-            queryset = queryset.order_by(ordering)
+        # Map area filters (geohash index, then exact bounds/distance)
+        try:
+            bbox = params.get('bbox')
+            if bbox:
+                queryset = queryset.filter(geo.bbox_filter(geo.parse_bbox(bbox)))
+
+            near = params.get('near')
+            if near:
+                latitude, longitude = geo.parse_point(near)
+                radius_km = geo.parse_radius(params.get('radius_km'), self.default_radius_km)
+                queryset = geo.filter_near(queryset, latitude, longitude, radius_km)
+        except geo.GeoError as error:
+            raise ValidationError({'error': str(error)})
 
         return queryset
 
+    def list(self, request, *args, **kwargs):
+        # Answer conditional requests before any query or serialization
+        etag, last_modified = caching.list_validators(request)
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is not None:
+            return set_validators(response, etag, last_modified)
+
+        # Serve repeated query strings from the response cache
+        key = caching.list_response_key(request)
+        data = caching.get_cached_response('property-list', key)
+        if data is None:
+            if getattr(settings, 'REALESTATE_FAST_LIST_SERIALIZER', True):
+                data = self.fast_list(request).data
+            else:
+                data = super().list(request, *args, **kwargs).data
+            caching.set_cached_response('property-list', key, data)
+        return set_validators(Response(data), etag, last_modified)
+
+    def fast_list(self, request):
+        """Same as ``list()``, serialized with FastPropertyListSerializer."""
+        fields = PropertyListSerializer.selected_fields(request.query_params)
+        serializer = FastPropertyListSerializer(request, fields)
+        queryset = self.filter_queryset(self.get_queryset()).values(
+            *serializer.columns(extra=('price', 'created_at'))
+        )
+        page = self.paginate_queryset(queryset)
+        if page is None:
+            return Response(serializer.serialize(list(queryset)))
+        return self.get_paginated_response(serializer.serialize(page))
+
+
+class PublicPropertyFacetsView(PublicPropertyListView):
+    """
+    Public endpoint with result counts per filter value.
+
+    Takes the same filters as the property list and returns, for ``status``,
+    ``bedrooms`` and the price and size buckets, how many properties each
+    value would match given the other active filters. The last bedrooms
+    value is flagged ``or_more`` and counts what ``min_bedrooms`` selects.
+    """
+
+    indexed_filters = ('q', 'location', 'bbox', 'near')
+
+    def list(self, request, *args, **kwargs):
+        key = caching.list_response_key(request, 'property-facets')
+        data = caching.get_cached_response('property-facets', key)
+        if data is None:
+            params = request.query_params
+            matching_ids = None
+            if any(params.get(name) for name in self.indexed_filters):
+                # Text and map filters are answered by their indexes; the facet
+                # filters and counts then run on the in-memory snapshot
+                matching_ids = self.get_filtered_queryset(
+                    Property.objects.all()
+                ).order_by().values_list('pk', flat=True)
+            try:
+                data = facet_counts(params, matching_ids, caching.request_property_state(request))
+            except (ValueError, ArithmeticError):
+                return Response(
+                    {'error': 'Invalid filter value'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            caching.set_cached_response('property-facets', key, data)
+        return Response(data)
+
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def property_clusters(request):
+    """
+    Clustered published properties for the map.
+
+    Query Parameters:
+    - zoom: Map zoom level (0-22), sets the cluster cell size
+    - bbox: west,south,east,north (degrees); defaults to the whole map
+
+    Returns one entry per cluster with its count, centroid and price range;
+    clusters of a single property also carry its id and slug.
+    """
+    try:
+        zoom = int(request.query_params.get('zoom', ''))
+    except ValueError:
+        return Response(
+            {'error': 'zoom is required and must be an integer'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    if not 0 <= zoom <= maps.MAX_ZOOM:
+        return Response(
+            {'error': f'zoom must be between 0 and {maps.MAX_ZOOM}'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    bbox = request.query_params.get('bbox')
+    try:
+        bbox = geo.parse_bbox(bbox) if bbox else (-180.0, -90.0, 180.0, 90.0)
+    except geo.GeoError as error:
+        return Response({'error': str(error)}, status=status.HTTP_400_BAD_REQUEST)
+
+    precision, clusters = maps.get_clusters(zoom, bbox)
+    return Response({
+        'zoom': zoom,
+        'precision': precision,
+        'clusters': clusters,
+    })
+
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def property_map_points(request):
+    """
+    All published properties with coordinates, for the map.
+
+    Query Parameters:
+    - encoding: json (default; one array per column) or binary (packed
+      little-endian, see ``maps.PointsFeed``)
+
+    Responses carry an ETag; a matching If-None-Match gets a 304.
+    """
+    encoding = request.query_params.get('encoding', 'json')
+    if encoding not in ('json', 'binary'):
+        return Response(
+            {'error': 'encoding must be json or binary'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    feed = maps.get_points_feed()
+    if encoding == 'binary':
+        content, etag, content_type = feed.binary, feed.binary_etag, 'application/octet-stream'
+    else:
+        content, etag, content_type = feed.json, feed.json_etag, 'application/json'
+
+    if etag in parse_etags(request.headers.get('If-None-Match', '')):
+        response = HttpResponseNotModified()
+    else:
+        response = HttpResponse(content, content_type=content_type)
+    response['ETag'] = etag
+    # Always revalidate; unchanged feeds cost a 304
+    patch_cache_control(response, no_cache=True)
+    return response
+
 
 class PublicPropertyDetailView(generics.RetrieveAPIView):
     """Public endpoint to get property details by slug."""
@@ -129,16 +332,43 @@ class PublicPropertyDetailView(generics.RetrieveAPIView):
     lookup_field = 'slug'
 
     def get_queryset(self):
+        fields = PropertyDetailSerializer.selected_fields(self.request.query_params)
         # Only show PUBLISHED properties to public
-        return Property.objects.filter(listing_status=Property.ListingStatus.PUBLISHED)
+        return Property.objects.filter(
+            listing_status=Property.ListingStatus.PUBLISHED
+        ).only(*PropertyDetailSerializer.only_fields(fields, extra=('updated_at', 'views_count')))
 
     def retrieve(self, request, *args, **kwargs):
-        instance = self.get_object()
-        # Increment views count
-        Property.objects.filter(pk=instance.pk).update(views_count=F('views_count') + 1)
-        instance.refresh_from_db()
-        serializer = self.get_serializer(instance)
-        return Response(serializer.data)
+        slug = kwargs['slug']
+        # One query for the row, which gives the validators and, when the
+        # response is not cached, is serialized after loading its images
+        prop = self.get_queryset().filter(slug=slug).first()
+        if prop is None:
+            raise Http404
+        self.check_object_permissions(request, prop)
+
+        # Count the view (written behind, see view_counter) and show the
+        # stored count plus the views not written yet
+        views_count = prop.views_count + view_counter.record(prop.pk)
+
+        # Answer conditional requests before serializing
+        validators = caching.detail_validators(request, slug, prop.pk, prop.updated_at)
+        response = get_conditional_response(request, etag=validators[0], last_modified=validators[1])
+        if response is not None:
+            return set_validators(response, *validators)
+
+        key = caching.detail_response_key(request, slug, prop.updated_at)
+        cached = caching.get_cached_response('property-detail', key)
+        if cached is not None:
+            data = cached[1]
+        else:
+            if 'images' in PropertyDetailSerializer.selected_fields(request.query_params):
+                prefetch_related_objects([prop], ordered_images())
+            data = self.get_serializer(prop).data
+            caching.set_cached_response('property-detail', key, data, pk=prop.pk)
+        if 'views_count' in data:
+            data = {**data, 'views_count': views_count}
+        return set_validators(Response(data), *validators)
 
 
 class MessageCreateView(generics.CreateAPIView):
@@ -229,6 +459,26 @@ def admin_me(request):
     })
 
 
+# =============================================================================
+# Admin Cache Views
+# =============================================================================
+
+@api_view(['GET', 'DELETE'])
+@permission_classes([IsAdminOrStaff])
+def admin_cache_stats(request):
+    """
+    Hit/miss counters of the public response cache.
+
+    DELETE resets the counters.
+    """
+    if request.method == 'DELETE':
+        caching.reset_response_cache_stats()
+    return Response({
+        'timeout': caching.response_cache_timeout(),
+        'responses': caching.response_cache_stats(),
+    })
+
+
 # =============================================================================
 # Admin Property Views
 # =============================================================================
@@ -238,7 +488,7 @@ class AdminPropertyViewSet(viewsets.ModelViewSet):
 
     queryset = Property.objects.all()
     permission_classes = [IsAdminOrStaff]
-    parser_classes = [MultiPartParser, FormParser, JSONParser]
+    parser_classes = [MultiPartParser, FormParser, ORJSONParser]
 
     def get_serializer_class(self):
         if self.action == 'list':
@@ -250,6 +500,17 @@ class AdminPropertyViewSet(viewsets.ModelViewSet):
     def get_queryset(self):
         queryset = Property.objects.all()
         params = self.request.query_params
+        if self.action in ('list', 'retrieve'):
+            # Load only the columns the requested fields read
+            serializer_class = self.get_serializer_class()
+            fields = serializer_class.selected_fields(params)
+            queryset = queryset.only(*serializer_class.only_fields(
+                fields, extra=('price', 'created_at', 'title', 'updated_at')
+            ))
+            if self.action == 'list' and 'cover_image' in fields:
+                queryset = queryset.with_cover_image()
+            if self.action == 'retrieve' and 'images' in fields:
+                queryset = queryset.with_images()
 
         # Filter by listing_status
         listing_status = params.get('listing_status')
@@ -274,8 +535,17 @@ class AdminPropertyViewSet(viewsets.ModelViewSet):
         """Create a copy of the property as Draft."""
         original = self.get_object()
 
-        # Create a new property with the same data
-        new_property = Property.objects.create(
+        with transaction.atomic():
+            new_property = self.copy_property(original)
+            self.copy_images(original, new_property)
+        images_bulk_created.send(sender=PropertyImage, property_id=new_property.pk)
+
+        serializer = PropertyDetailSerializer(new_property, context={'request': request})
+        return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+    def copy_property(self, original):
+        """Create a draft copy of a property's data."""
+        return Property.objects.create(
             title=f"{original.title} (Copy)",
             status=original.status,
             price=original.price,
@@ -296,17 +566,23 @@ class AdminPropertyViewSet(viewsets.ModelViewSet):
             agent_email=original.agent_email,
         )
 
-        # Copy images
-        for image in original.images.all():
-            PropertyImage.objects.create(
+    def copy_images(self, original, new_property):
+        """
+        Copy the image rows (sharing the files) with one INSERT; the known
+        dimensions are carried over so no file is re-read.
+        """
+        PropertyImage.objects.bulk_create([
+            PropertyImage(
                 property=new_property,
-                image=image.image,
+                image=image.image.name,
                 alt_text=image.alt_text,
                 sort_order=image.sort_order,
+                width=image.width,
+                height=image.height,
+                variants=image.variants,
             )
-
-        serializer = PropertyDetailSerializer(new_property, context={'request': request})
-        return Response(serializer.data, status=status.HTTP_201_CREATED)
+            for image in original.images.all()
+        ])
 
     @action(detail=True, methods=['post'])
     def toggle_featured(self, request, pk=None):
@@ -414,13 +690,111 @@ class AdminPropertyViewSet(viewsets.ModelViewSet):
             'message': f'Status updated to {property_obj.get_listing_status_display()}'
         })
 
+    def bulk_change(self, request, fields, new_values):
+        """Apply a bulk action to the properties selected by the request body."""
+        try:
+            queryset, ids = bulk_actions.select(request.data)
+            results, updated = bulk_actions.apply(queryset, fields, new_values, ids)
+        except bulk_actions.SelectionError as error:
+            return Response({'error': str(error)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({
+            'matched': sum(result['result'] != 'not_found' for result in results),
+            'updated': updated,
+            'results': results,
+        })
+
+    def bulk_set_listing_status(self, request, listing_status):
+        values = bulk_actions.listing_status_values(listing_status)
+        return self.bulk_change(request, tuple(values), lambda current: values)
+
+    @action(detail=False, methods=['post'])
+    def bulk_publish(self, request):
+        """
+        Publish several properties with one UPDATE.
+        Expects JSON: {"ids": [...]} or {"filter": {...}} (see bulk_actions.FILTERS).
+        """
+        return self.bulk_set_listing_status(request, Property.ListingStatus.PUBLISHED)
+
+    @action(detail=False, methods=['post'])
+    def bulk_archive(self, request):
+        """Archive several properties; same body as bulk_publish."""
+        return self.bulk_set_listing_status(request, Property.ListingStatus.ARCHIVED)
+
+    @action(detail=False, methods=['post'])
+    def bulk_mark_sold(self, request):
+        """Mark several properties as SOLD; same body as bulk_publish."""
+        return self.bulk_set_listing_status(request, Property.ListingStatus.SOLD)
+
+    @action(detail=False, methods=['post'])
+    def bulk_update_listing_status(self, request):
+        """
+        Set the listing status of several properties.
+        Expects JSON: listing_status, plus ids or filter as for bulk_publish.
+        """
+        new_status = request.data.get('listing_status')
+        valid_statuses = [choice[0] for choice in Property.ListingStatus.choices]
+        if new_status not in valid_statuses:
+            return Response(
+                {'error': f'Invalid status. Must be one of: {", ".join(valid_statuses)}'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return self.bulk_set_listing_status(request, new_status)
+
+    @action(detail=False, methods=['post'])
+    def bulk_toggle_featured(self, request):
+        """
+        Toggle the featured flag of several properties, or set it for all of
+        them with an optional "featured": true/false; ids or filter as for
+        bulk_publish.
+        """
+        featured = request.data.get('featured')
+        if featured is None:
+            return self.bulk_change(
+                request, ('featured',), lambda current: {'featured': not current['featured']}
+            )
+        if not isinstance(featured, bool):
+            return Response(
+                {'error': 'featured must be true or false'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return self.bulk_change(request, ('featured',), lambda current: {'featured': featured})
+
+    @action(detail=False, methods=['post'], url_path='import')
+    def import_feed(self, request):
+        """
+        Import or update properties from an uploaded feed.
+        Expects multipart: file, source, optional format (csv, json, jsonl)
+        and batch_size.
+        """
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response(
+                {'error': 'file is required'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        feed_format = request.data.get('format') or importer.guess_format(upload.name)
+        try:
+            batch_size = int(request.data.get('batch_size') or importer.DEFAULT_BATCH_SIZE)
+        except ValueError:
+            return Response(
+                {'error': 'batch_size must be an integer'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        try:
+            feed_importer = importer.PropertyImporter(request.data.get('source', ''), batch_size)
+            stats = feed_importer.run(importer.read_records(upload, feed_format))
+        except importer.FeedError as error:
+            return Response({'error': str(error)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(stats)
+
 
 class AdminPropertyImageViewSet(viewsets.ModelViewSet):
     """Admin CRUD for property images."""
 
     serializer_class = PropertyImageSerializer
     permission_classes = [IsAdminOrStaff]
-    parser_classes = [MultiPartParser, FormParser]
+    parser_classes = [MultiPartParser, FormParser, ORJSONParser]
 
     def get_queryset(self):
         property_id = self.kwargs.get('property_pk')
@@ -433,7 +807,9 @@ class AdminPropertyImageViewSet(viewsets.ModelViewSet):
             property_id=property_id
         ).order_by('-sort_order').first()
         next_order = (last_image.sort_order + 1) if last_image else 0
-        serializer.save(property_id=property_id, sort_order=next_order)
+        image = serializer.save(property_id=property_id, sort_order=next_order)
+        # Resized variants are rendered off the request path
+        transaction.on_commit(partial(image_pipeline.enqueue, image.pk))
 
     @action(detail=False, methods=['post'])
     def reorder(self, request, property_pk=None):
@@ -442,10 +818,36 @@ class AdminPropertyImageViewSet(viewsets.ModelViewSet):
         Expects: { "order": [id1, id2, id3, ...] }
         """
         order = request.data.get('order', [])
-        for index, image_id in enumerate(order):
-            PropertyImage.objects.filter(
-                id=image_id, property_id=property_pk
-            ).update(sort_order=index)
+        try:
+            if not isinstance(order, list):
+                raise TypeError
+            order = [int(image_id) for image_id in order]
+        except (TypeError, ValueError):
+            return Response(
+                {'error': 'order must be a list of image ids'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        # The order has to list each of the property's images exactly once
+        images = PropertyImage.objects.filter(property_id=property_pk).order_by()
+        current = dict(images.values_list('id', 'sort_order'))
+        if len(order) != len(set(order)) or set(order) != set(current):
+            return Response(
+                {'error': 'order must list each of the property\'s images exactly once'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        # One UPDATE for all the images whose position changes
+        changes = {
+            image_id: index for index, image_id in enumerate(order)
+            if current[image_id] != index
+        }
+        if changes:
+            images.filter(id__in=list(changes)).update(sort_order=Case(
+                *[When(id=image_id, then=Value(index)) for image_id, index in changes.items()],
+                output_field=PositiveIntegerField()
+            ))
+            images_reordered.send(sender=PropertyImage, property_id=property_pk)
         return Response({'message': 'Images reordered successfully'})
 
 
@@ -740,7 +1142,9 @@ class AdminBuyerSearchViewSet(viewsets.ModelViewSet):
     def matches(self, request, pk=None):
         """Get matching properties for this buyer search."""
         buyer_search = self.get_object()
-        queryset = Property.objects.filter(listing_status=Property.ListingStatus.PUBLISHED)
+        queryset = Property.objects.with_cover_image().filter(
+            listing_status=Property.ListingStatus.PUBLISHED
+        )
 
         # Apply filters based on buyer preferences
         if buyer_search.bedrooms_min:
@@ -816,6 +1220,8 @@ class AdminNotificationViewSet(viewsets.ModelViewSet):
             queryset = queryset.exclude(priority=Notification.Priority.HIGH)
 
         count = queryset.update(is_read=True)
+        # Bulk update bypasses post_save, so invalidate cached counts here
+        caching.bump_generation(Notification)
         return Response({
             'message': f'{count} notifications marked as read',
             'count': count
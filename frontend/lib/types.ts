@@ -2,6 +2,13 @@
 export type PropertyStatus = 'BUY' | 'RENT' | 'COMMERCIAL' | 'DEVELOPMENT';
 export type ListingStatus = 'DRAFT' | 'PUBLISHED' | 'SOLD' | 'ARCHIVED';
 
+export interface ImageVariant {
+  width: number;
+  height: number;
+  webp?: string;
+  jpeg?: string;
+}
+
 export interface PropertyImage {
   id: number;
   image: string;
@@ -10,6 +17,8 @@ export interface PropertyImage {
   sort_order: number;
   width: number | null;
   height: number | null;
+  variants: Record<string, ImageVariant>;
+  srcset: { webp?: string; jpeg?: string } | null;
 }
 
 export interface PropertyListItem {